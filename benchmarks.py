@@ -0,0 +1,370 @@
+'''
+Micro-benchmarks for the text processing pipeline
+
+Usage:
+    python benchmarks.py extract [page.html ...]
+    python benchmarks.py classify [page.html ...]
+    python benchmarks.py chunk [page.html ...]
+    python benchmarks.py ocr [photo.jpg ...]
+
+With no files, a synthetic menu page with deeply nested markup (or, for ocr, a skewed
+12MP menu photo) is generated.
+Saved pages from real crawls give the most representative numbers.
+'''
+import os
+import re
+import time
+import resource
+import tempfile
+import multiprocessing
+import random
+import argparse
+import tracemalloc
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from bs4 import BeautifulSoup
+
+
+def synthetic_menu_page(items=2000, depth=25) -> str:
+    """Build a large menu page wrapped in many layers of layout divs, like page builders emit."""
+    rows = "".join(
+        f'<div class="item"><h4><span>Dish {i}</span></h4><p>Slow roasted <b>ingredient {i}</b> '
+        f'with seasonal vegetables</p><span class="price">${i % 40 + 5}</span>'
+        f'<img src="https://cdn.example.com/img/{i}.jpg"></div>'
+        for i in range(items)
+    )
+    return "<html><body>" + '<div class="wrap">' * depth + rows + "</div>" * depth + "</body></html>"
+
+
+def legacy_extract_lines(html: str, repetition_threshold=5) -> list:
+    """The previous find_all(True) + tag.text extraction, kept only as a baseline."""
+    bs_parser = BeautifulSoup(html, "html.parser")
+    for tag in bs_parser.find_all(["script", "style", "meta", "link", "svg", "noscript"], recursive=True):
+        tag.decompose()
+
+    raw_lines = []
+    recent_lines = deque(maxlen=repetition_threshold)
+    for tag in bs_parser.find_all(True):
+        if tag.name == "img" and tag.has_attr("src"):
+            line = f"IMAGE[{tag['src'].strip()}]"
+        else:
+            line = " ".join(tag.text.split())
+        if line and line not in recent_lines:
+            raw_lines.append(line)
+            recent_lines.append(line)
+    return raw_lines
+
+
+def legacy_is_non_content(line: str) -> bool:
+    """The previous per-line filter_lines heuristic with uncompiled regexes, kept only as a baseline."""
+    snippet = line[:100].strip()
+    if len(re.sub(r"[a-zA-Z0-9\s]", "", snippet)) / max(len(snippet), 1) > 0.4:
+        return True
+    if re.search(r"<[a-zA-Z]+.*?>", snippet):
+        return True
+    if re.match(r"data:image/[a-zA-Z]+;base64,", snippet):
+        return True
+    if len(snippet) > 50 and " " not in snippet:
+        return True
+    if re.match(r"^!function|^window\.\w+|^{\"|^\[", snippet):
+        return True
+    if len(re.findall(r"[{}[\]]", snippet)) / max(len(snippet), 1) > 0.2:
+        return True
+    if re.search(r"\"[^\"]+\"\s*:\s*[^\s]+", snippet):
+        return True
+    return False
+
+
+def synthetic_scraped_lines(count=50000) -> list:
+    """Mix menu-like lines with the markup, script and data noise scraped pages contain."""
+    random.seed(0)
+    templates = [
+        "Margherita Pizza {i} tomato, mozzarella, basil $14",
+        "Grilled salmon with lemon butter and seasonal greens",
+        "IMAGE[https://cdn.example.com/img/{i}.jpg]",
+        "<div class=\"item-{i}\"><span>",
+        "window.__INITIAL_STATE__ = {{\"menu\": {i}}}",
+        "{{\"id\": {i}, \"name\": \"dish\"}}",
+        "aGVsbG8gd29ybGQgdGhpcyBpcyBiYXNlNjQgZW5jb2RlZCBkYXRhIHRoYXQgZ29lcyBvbg{i}",
+        "© 2024 All rights reserved | Privacy Policy | Terms",
+    ]
+    return [random.choice(templates).format(i=i) for i in range(count)]
+
+
+def legacy_chunk_text_data(text_list, chunk_size, buffer_size=100) -> list:
+    """The previous character-based chunker that re-joined the chunk for every sentence, kept only as a baseline."""
+    full_text = " ".join(text_list)
+    sentences = re.split(r'(?<=[.!?]) +', full_text)
+    chunks, current_chunk = [], []
+    for sentence in sentences:
+        if len(" ".join(current_chunk) + sentence) > chunk_size:
+            chunk = " ".join(current_chunk).strip()
+            chunks.append(chunk)
+            current_chunk = [chunk[max(0, len(chunk) - buffer_size):]]
+        current_chunk.append(sentence)
+    if current_chunk:
+        chunks.append(" ".join(current_chunk).strip())
+    return chunks
+
+
+def synthetic_menu_lines(items=5000) -> list:
+    """Menu text as filter_lines hands it over: one name, description and price line per item."""
+    random.seed(0)
+    lines = []
+    for i in range(items):
+        if i % 40 == 0:
+            lines.append(f"Section {i // 40}")
+        lines.append(f"Dish {i}")
+        lines.append(" ".join(random.choice(["roasted", "seasonal", "house", "crispy", "garlic", "herb"]) for _ in range(12)) + ".")
+        lines.append(f"${i % 40 + 5}.00")
+    return lines
+
+
+def synthetic_menu_photo(path: str, size=(4032, 3024)):
+    """Save a phone-sized JPEG of a two-column menu, slightly rotated like a handheld shot."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    image = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=56)
+    for column, left in enumerate((200, size[0] // 2 + 100)):
+        for row in range(30):
+            top = 250 + row * 85
+            draw.text((left, top), f"Dish {column * 30 + row} with roasted garlic", fill="black", font=font)
+            draw.text((left + 1300, top), f"${row + 8}.00", fill="black", font=font)
+    image.rotate(2, expand=True, fillcolor="white").save(path, quality=90)
+
+
+def legacy_load_image(path: str):
+    """Fully decode the photo as the PDF round trip did before handing it to tesseract."""
+    from PIL import Image
+
+    image = Image.open(path)
+    image.load()
+    return image
+
+
+def legacy_ocr_image(path: str) -> str:
+    """The previous image -> tesseract PDF -> PDF text round trip, kept only as a baseline."""
+    import io
+    import pytesseract
+    from pypdf import PdfReader
+
+    pdf_bytes = pytesseract.image_to_pdf_or_hocr(legacy_load_image(path), extension="pdf")
+    return "".join(page.extract_text() or "" for page in PdfReader(io.BytesIO(pdf_bytes)).pages)
+
+
+def timed_peak_rss(function_name: str, path: str) -> (float, int):
+    """Run one benchmark function on a file and return (seconds, peak RSS in KiB of this process)."""
+    import image_ingest
+
+    function = globals().get(function_name) or getattr(image_ingest, function_name)
+    start_time = time.perf_counter()
+    function(path)
+    return time.perf_counter() - start_time, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def in_fresh_process(function_name: str, path: str) -> (float, int):
+    # A new process per run so ru_maxrss reflects only this function, including memory held by PIL and tesseract in C
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(timed_peak_rss, function_name, path).result()
+
+
+def measure(function, *args, repeat=3) -> (float, int, object):
+    """
+    Return (best seconds over `repeat` runs, peak Python heap bytes, result).
+    Timing and memory are measured in separate runs since tracing slows everything down;
+    memory allocated inside C parsers (lxml) is not visible to tracemalloc.
+    """
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = function(*args)
+        timings.append(time.perf_counter() - start_time)
+
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak, result
+
+
+def report(name: str, baseline: tuple, candidate: tuple):
+    base_time, base_peak, base_result = baseline
+    new_time, new_peak, new_result = candidate
+    print(
+        f"{name}: {base_time:.3f}s -> {new_time:.3f}s ({base_time / max(new_time, 1e-9):.1f}x), "
+        f"peak heap {base_peak / 2**20:.1f} MiB -> {new_peak / 2**20:.1f} MiB, "
+        f"{len(base_result)} -> {len(new_result)} items"
+    )
+
+
+PRICE_MARKUP = '<div><h4>Margherita Pizza</h4><p>Tomato, basil</p><span>$12</span></div>'
+
+
+def check_extract_keeps_prices():
+    """Regression check: a price in its own inline element must survive extraction, next to its dish."""
+    from process_text import extract_lines_from_html
+
+    lines = extract_lines_from_html(PRICE_MARKUP)
+    assert any("$12" in line for line in lines), f"price lost in extraction: {lines}"
+    assert "$" in extract_lines_from_html('<p>Soup</p><span>$9.50</span>')[-1]
+
+
+XHTML_MARKUP = '<?xml version="1.0" encoding="utf-8"?>\n<html xmlns="http://www.w3.org/1999/xhtml"><body><p>Soup of the day</p></body></html>'
+
+
+def check_extract_reads_xhtml():
+    """Regression check: pages starting with an XML declaration must still be parsed."""
+    from process_text import extract_lines_from_html
+    lines = extract_lines_from_html(XHTML_MARKUP)
+    assert lines == ["Soup of the day"], f"xhtml page not extracted: {lines}"
+
+
+# What dom_snapshot.take_snapshot returns for a page with a same-origin iframe and an open shadow root
+SNAPSHOT_MARKUP = (
+    '<html><head><title>Cafe</title></head><body><p>Main</p>'
+    '<iframe src="/f" data-snapshot-flattened="1"></iframe>'
+    '<div data-snapshot-shadow="1"><p>Shadow dish $7</p></div>\n'
+    '<div data-snapshot-frame="/f"><p>Frame dish $9</p><div data-snapshot-frame="/g"><p>Nested dish $5</p></div></div>'
+    '</body></html>'
+)
+
+
+def check_extract_keeps_snapshot_sections():
+    """Regression check: shadow-root and iframe sections of a rendered snapshot must reach the extractor."""
+    from process_text import extract_lines_from_html
+    lines = extract_lines_from_html(SNAPSHOT_MARKUP)
+    for dish in ("Shadow dish $7", "Frame dish $9", "Nested dish $5"):
+        assert dish in lines, f"snapshot section lost in extraction: {lines}"
+
+
+def bench_extract(paths: list):
+    from process_text import extract_lines_from_html
+
+    check_extract_keeps_prices()
+    check_extract_reads_xhtml()
+    check_extract_keeps_snapshot_sections()
+    pages = [(path, open(path, encoding="utf-8", errors="ignore").read()) for path in paths]
+    pages = pages or [("synthetic", synthetic_menu_page())]
+    for name, html in pages:
+        print(f"{name}: {len(html) / 2**20:.2f} MiB of html")
+        baseline, candidate = measure(legacy_extract_lines, html), measure(extract_lines_from_html, html)
+        report(name, baseline, candidate)
+        prices = [sum(bool(re.search(r"[$€£]\s?\d", line)) for line in result[2]) for result in (baseline, candidate)]
+        print(f"{name}: lines carrying a price {prices[0]} -> {prices[1]}")
+
+
+def bench_classify(paths: list):
+    from line_classifier import LineClassifier
+    from process_text import extract_lines_from_html
+
+    lines = [
+        line for path in paths
+        for line in extract_lines_from_html(open(path, encoding="utf-8", errors="ignore").read())
+    ]
+    lines = lines or synthetic_scraped_lines()
+    classifier = LineClassifier()
+
+    def legacy(lines):
+        return [line for line in lines if not legacy_is_non_content(line)]
+
+    def compiled(lines):
+        return classifier.classify(lines)[0]
+
+    baseline, candidate = measure(legacy, lines), measure(compiled, lines)
+    assert baseline[2] == candidate[2], "classifier decisions differ from the legacy heuristic"
+    print(f"{len(lines)} lines")
+    report("classify", baseline, candidate)
+    print(f"rule hits: {dict(classifier.classify(lines)[1])}")
+
+
+def bench_chunk(paths: list, chunk_size=500):
+    from text_chunker import TextChunker, get_token_counter
+    from process_text import extract_lines_from_html
+
+    lines = [
+        line for path in paths
+        for line in extract_lines_from_html(open(path, encoding="utf-8", errors="ignore").read())
+    ]
+    lines = lines or synthetic_menu_lines()
+    count_tokens = get_token_counter()
+    chunker = TextChunker(count_tokens=count_tokens)
+
+    def chunked(lines):
+        return list(chunker.chunks(lines))
+
+    baseline, candidate = measure(legacy_chunk_text_data, lines, chunk_size), measure(chunked, lines)
+    print(f"{len(lines)} lines")
+    report("chunk", baseline, candidate)
+    for name, (_, _, chunks) in (("legacy", baseline), ("token", candidate)):
+        tokens = [count_tokens(chunk) for chunk in chunks]
+        print(
+            f"{name}: {len(chunks)} chunks (= generate_items calls), {sum(tokens)} tokens sent, "
+            f"largest {max(tokens)}, mean {sum(tokens) / len(tokens):.0f}"
+        )
+
+
+def bench_ocr(paths: list):
+    import pytesseract
+
+    with tempfile.TemporaryDirectory() as directory:
+        if not paths:
+            paths = [os.path.join(directory, "synthetic_menu.jpg")]
+            # Drawn in a worker: a child's peak RSS starts from its parent's, so the parent must stay small
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                pool.submit(synthetic_menu_photo, paths[0]).result()
+
+        for path in paths:
+            legacy, new = in_fresh_process("legacy_load_image", path), in_fresh_process("preprocess", path)
+            print(
+                f"{os.path.basename(path)} load+preprocess: {legacy[0]:.2f}s -> {new[0]:.2f}s, "
+                f"peak RSS {legacy[1] / 1024:.0f} MiB -> {new[1] / 1024:.0f} MiB"
+            )
+
+        try:
+            pytesseract.get_tesseract_version()
+        except pytesseract.TesseractNotFoundError:
+            print("tesseract not installed; skipping OCR throughput")
+            return
+
+        for path in paths:
+            legacy, new = in_fresh_process("legacy_ocr_image", path), in_fresh_process("ocr_image", path)
+            print(
+                f"{os.path.basename(path)} OCR: pdf round trip {legacy[0]:.2f}s / {legacy[1] / 1024:.0f} MiB peak -> "
+                f"direct {new[0]:.2f}s / {new[1] / 1024:.0f} MiB peak"
+            )
+
+        # Throughput per core: the same batch serially in one worker, then across every core
+        from image_ingest import ocr_image
+        batch = paths * max(1, 8 // len(paths))
+        for workers in (1, os.cpu_count() or 1):
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                list(pool.map(ocr_image, paths[:1] * workers))  # Warm the workers up
+                start_time = time.perf_counter()
+                list(pool.map(ocr_image, batch))
+                elapsed = time.perf_counter() - start_time
+            print(f"{workers} workers: {len(batch) / elapsed:.2f} images/s, {len(batch) / elapsed / workers:.2f} images/s per core")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+    extract_parser = subparsers.add_parser("extract", help="html text extraction")
+    extract_parser.add_argument("paths", nargs="*", help="saved html pages")
+    classify_parser = subparsers.add_parser("classify", help="rule-based line classification")
+    classify_parser.add_argument("paths", nargs="*", help="saved html pages to take lines from")
+    chunk_parser = subparsers.add_parser("chunk", help="chunking text for generate_items")
+    chunk_parser.add_argument("paths", nargs="*", help="saved html pages to take lines from")
+    ocr_parser = subparsers.add_parser("ocr", help="image preprocessing memory and OCR throughput")
+    ocr_parser.add_argument("paths", nargs="*", help="menu photos")
+
+    args = parser.parse_args()
+    if args.benchmark == "extract":
+        bench_extract(args.paths)
+    elif args.benchmark == "classify":
+        bench_classify(args.paths)
+    elif args.benchmark == "chunk":
+        bench_chunk(args.paths)
+    elif args.benchmark == "ocr":
+        bench_ocr(args.paths)
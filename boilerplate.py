@@ -0,0 +1,89 @@
+import re
+import hashlib
+import threading
+from typing import List
+
+BOILERPLATE_MIN_PAGES = 3  # A line must have been seen on this many pages before it is stripped
+BOILERPLATE_MIN_FRACTION = 0.5  # ...and on at least this share of the pages seen so far
+
+# Menu content repeats across a site's lunch/dinner/brunch pages too and must survive on every one:
+# lines with a price, and short headings ("Appetizers", "Wines") whose next few lines carry prices
+PRICE_PATTERN = re.compile(r"[$€£]\s?\d|\b\d{1,3}[.,]\d{2}\b")
+HEADING_MAX_WORDS = 5
+HEADING_LOOKAHEAD = 3
+
+
+def menu_content_lines(lines: List[str]) -> set:
+    """Indexes of lines that look like menu items or the section headings above them."""
+    priced = [bool(PRICE_PATTERN.search(line)) for line in lines]
+    protected = set()
+    for i, line in enumerate(lines):
+        if priced[i]:
+            protected.add(i)
+        elif len(line.split()) <= HEADING_MAX_WORDS and not line.rstrip().endswith((".", "!", "?")):
+            if any(priced[i + 1:i + 1 + HEADING_LOOKAHEAD]):
+                protected.add(i)
+    return protected
+
+
+def line_key(line: str) -> bytes:
+    """Hash a whitespace/case-normalized line; 8 bytes keeps the index small on large sites."""
+    normalized = " ".join(line.lower().split())
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest()
+
+
+class BoilerplateIndex:
+    '''
+    Per-crawl count of how many pages each line appears on, used to strip site-wide boilerplate
+
+    Navigation, footers, hours, addresses and cookie banners repeat on every page of a site.
+    Pages are extracted concurrently while the crawl is still running, so the index is built
+    online: the first pages carrying a line keep it (one copy survives for the LLM to see),
+    and once the line has shown up on min_pages pages and on at least min_fraction of the
+    pages seen so far, later copies are removed before any LLM filtering. Lines that look like
+    menu content (priced items and the headings above them) are never removed.
+    min_pages: int # pages a line must appear on before it counts as boilerplate
+    min_fraction: float # share of pages seen so far a line must appear on
+    '''
+    def __init__(
+        self,
+        min_pages: int = BOILERPLATE_MIN_PAGES,
+        min_fraction: float = BOILERPLATE_MIN_FRACTION
+    ):
+        self.min_pages = min_pages
+        self.min_fraction = min_fraction
+        self.page_counts = {}  # line hash -> number of pages containing it
+        self.pages_seen = 0
+        self.stats = {"lines_seen": 0, "lines_removed": 0, "chars_seen": 0, "chars_removed": 0}
+        self.lock = threading.Lock()
+
+    def strip(
+        self,
+        lines: List[str]
+    ) -> List[str]:
+        """Record one page's lines and return them without the ones that are site-wide boilerplate."""
+        keys = [line_key(line) for line in lines]
+        protected = menu_content_lines(lines)
+        with self.lock:
+            self.pages_seen += 1
+            for key in set(keys):
+                self.page_counts[key] = self.page_counts.get(key, 0) + 1
+
+            kept = []
+            for i, (line, key) in enumerate(zip(lines, keys)):
+                count = self.page_counts[key]
+                if i not in protected and count >= self.min_pages and count >= self.min_fraction * self.pages_seen:
+                    self.stats["lines_removed"] += 1
+                    self.stats["chars_removed"] += len(line)
+                else:
+                    kept.append(line)
+            self.stats["lines_seen"] += len(lines)
+            self.stats["chars_seen"] += sum(len(line) for line in lines)
+        return kept
+
+    def get_stats(self) -> dict:
+        """Return page/line/character counts and the share of characters removed."""
+        with self.lock:
+            stats = dict(self.stats, pages=self.pages_seen, distinct_lines=len(self.page_counts))
+        stats["removed_fraction"] = round(stats["chars_removed"] / stats["chars_seen"], 3) if stats["chars_seen"] else 0.0
+        return stats
@@ -1,154 +1,155 @@
 import time
 import re
-import os
+import threading
 import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from openai_functions import informed_deletion
-from process_text import process_pdf
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from driver_pool import DriverPool
+from frontier import CrawlFrontier
+from http_client import get_session
+from page_readiness import PageReadiness
+from resource_filter import ResourceFilter
+from dom_snapshot import take_snapshot
+from site_discovery import SiteDiscovery, parse_lastmod
+from url_canon import canonical_host, SimHashIndex
+from link_probe import LinkProbe
+from page_cache import PageCache
+
+# Signals used to decide whether a statically fetched page needs a full browser render
+SPA_ROOT_PATTERN = re.compile(r"<div[^>]+id=[\"'](?:root|app|__next|__nuxt|___gatsby)[\"']", re.IGNORECASE)
+MENU_TEXT_PATTERN = re.compile(
+    r"\$\s?\d|\bmenu\b|appetizer|entr[eé]e|dessert|starter|lunch|dinner|brunch|cocktail|wine",
+    re.IGNORECASE,
+)
+MIN_STATIC_TEXT_LENGTH = 200
+PRICE_PATTERN = re.compile(r"[$€£]\s?\d|\b\d{1,3}[.,]\d{2}\b")
+# Empty containers a script fills in later: SPA roots and embedded menu/ordering widgets
+MOUNT_NODE_PATTERN = re.compile(
+    r"^(?:root|app|__next|__nuxt|___gatsby)$|(?:^|[-_])(?:widget|embed|mount|menu|menus)(?:$|[-_])", re.IGNORECASE
+)
+# ...but not the empty hamburger buttons and icons themes give the same names
+MOUNT_NODE_EXCLUDE_PATTERN = re.compile(r"toggle|icon|btn|button|overlay|open|close|trigger", re.IGNORECASE)
+MOUNT_TAGS = ["div", "section", "main", "article"]
+SCRIPT_TEXT_RATIO = 3  # Inline script this many times longer than the page's own text means the text comes from script
+MENU_PAGE_SCORE = 5  # Urls the frontier scores at least this high (a "menu" token) should show prices
+
+# Site chrome repeated on every page; left out of duplicate fingerprints so only the page's own content is compared
+CHROME_TAGS = ["nav", "header", "footer", "aside", "form"]
+CHROME_ROLES = ["navigation", "banner", "contentinfo", "complementary", "search"]
+# Older themes mark chrome with classes or ids instead; matched as whole tokens so "section-header" stays
+CHROME_NAMES = {"nav", "navbar", "navigation", "site-nav", "site-header", "site-footer", "footer", "sidebar", "breadcrumb", "breadcrumbs"}
+
+# Cross-origin frames have no anchor text to score, so they are queued at a fixed priority
+FRAME_SCORE = 3
+# Frame hosts that never hold menu text: maps, video, social widgets, captchas and ads
+FRAME_DENYLIST_PATTERN = re.compile(
+    r"(?:^|\.)(?:google\.[a-z.]+|googleapis\.com|youtube(?:-nocookie)?\.com|vimeo\.com|facebook\.com|"
+    r"instagram\.com|twitter\.com|x\.com|doubleclick\.net|mapbox\.com|openstreetmap\.org)$",
+    re.IGNORECASE,
+)
+
+
+def is_mount_node(tag) -> bool:
+    """Whether an element is an empty container named like an app root or an embedded widget."""
+    names = tag.get("class", []) + [tag.get("id", "")]
+    if not any(MOUNT_NODE_PATTERN.search(name) for name in names):
+        return False
+    if any(MOUNT_NODE_EXCLUDE_PATTERN.search(name) for name in names):
+        return False
+    return not tag.get_text(strip=True) and tag.find(["img", "iframe", "picture", "svg"]) is None
 
 
 class Crawler:
-    def __init__(self, start_url, max_depth=3):
+    def __init__(self, start_url, max_depth=3, pool_size=4, max_per_domain=4, page_budget=10.0,
+                 resource_filter=None, block_resources=True, driver_pool=None, page_cache=None,
+                 use_cache=True, max_pages=25, max_bytes=50_000_000, max_seconds=180, use_sitemaps=True,
+                 max_pdf_probes=40):
         self.start_url = start_url
         self.core_link = re.search(r"(?:https?://)?(?:www\.)?([^/]+)", self.start_url).group(1)
         self.max_depth = max_depth
-        self.visited = set()  # Use a set to track visited URLs
+        self.pool_size = pool_size
+        self.max_per_domain = max_per_domain
+        self.frontier = CrawlFrontier(max_depth)
+        self.visited = self.frontier.seen  # Every url ever enqueued
+        self.max_pages = max_pages  # Crawl budgets; None disables a budget
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.pages_started = 0
+        self.bytes_fetched = 0
+        self.crawl_started_at = None
+        self.use_sitemaps = use_sitemaps
+        self.sitemap_lastmod = {}  # url -> sitemap lastmod timestamp, for pages seeded from sitemaps
+        self.fingerprints = SimHashIndex()  # Text fingerprints of every page kept so far
+        self.duplicates = []  # (url, url it duplicates) for pages dropped before extraction
         self.relevant_links = set()  # Now stores (link, content) tuples
         self.pdf_links = set()  # Now stores (link, content) tuples
-        self.driver = self.create_driver()
+        self.results_lock = threading.Lock()
+        self.domain_slots = {}  # netloc -> semaphore bounding concurrent renders per domain
+        self.domain_slots_lock = threading.Lock()
+        if driver_pool is not None:
+            # A long-lived pool (e.g. the worker's) already carries its own resource filter
+            resource_filter = driver_pool.resource_filter
+        elif resource_filter is None and block_resources:
+            resource_filter = ResourceFilter()
+        self.resource_filter = resource_filter  # Blocks media, fonts and trackers in rendered pages
+        self.owns_pool = driver_pool is None
+        self.driver_pool = driver_pool or DriverPool(pool_size, resource_filter=resource_filter)
+        self.domain_tiers = {}  # netloc -> "static" or "render"
+        self.link_probe = LinkProbe()  # Shared, memoized content-type probes for PDF discovery
+        self.max_pdf_probes = max_pdf_probes  # Most PDF candidates probed per crawl, best scoring first
+        self.pdf_probed = set()  # PDF candidates submitted to the probe
+        self.pdf_skipped = set()  # PDF candidates passed over, so each is reported once
+        self.owns_cache = page_cache is None and use_cache
+        if self.owns_cache:
+            page_cache = PageCache()
+        self.page_cache = page_cache  # Persistent store of fetched pages for conditional revisits
+        self.readiness = PageReadiness(
+            budget=page_budget,
+            on_network_events=resource_filter.record_events if resource_filter else None,
+        )
+        self.readiness_metrics = []  # One entry per rendered page describing how long it waited
+        self.resource_stats_start = {}  # Resource filter counters when the crawl began; the filter may be shared
 
     def __del__(self):
-        self.driver.quit()
-
-    def create_driver(self):
-        """Setup Selenium WebDriver with Headless Chrome."""
-        print("🔧 Initializing Selenium WebDriver...")
-
-        # Define paths for Chrome and ChromeDriver
-        chromium_path = "/usr/bin/google-chrome"  # Use the standard system-installed Chrome path
-        driver_path = "/usr/bin/chromedriver"  # Standard location for ChromeDriver
-
-        # Set Chrome options
-        chrome_options = Options()
-        chrome_options.binary_location = chromium_path
-        chrome_options.add_argument("--headless")  # Run in headless mode
-        chrome_options.add_argument("--no-sandbox")  # Required for AWS Lambda/EC2
-        chrome_options.add_argument("--disable-dev-shm-usage")  # Avoid shared memory issues
-        chrome_options.add_argument("--disable-gpu")  # Disable GPU hardware acceleration
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")  # Reduce bot detection
-        chrome_options.add_argument("--disable-infobars")  # Remove the Chrome info bar
-
-        print(f"✅ Launching WebDriver with Chrome at {chromium_path} and Driver at {driver_path}")
-
-        # Initialize and return the WebDriver
-        return webdriver.Chrome(service=Service(driver_path), options=chrome_options)
-
-    def scroll_until_loaded(self, timeout=10):
-        """Scrolls the page until no new content is loaded."""
-        last_height = self.driver.execute_script("return document.body.scrollHeight")
-        start_time = time.time()
-
-        while True:
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)  # Allow time for new content to load
-            new_height = self.driver.execute_script("return document.body.scrollHeight")
-
-            if new_height == last_height or (time.time() - start_time) > timeout:
-                break
-            last_height = new_height
-
-    def wait_for_elements(self, timeout=10):
-        """Wait until all elements are fully loaded."""
-        try:
-            WebDriverWait(self.driver, timeout).until(
-                EC.presence_of_all_elements_located((By.XPATH, "//*"))
-            )
-        except Exception as e:
-            print(f"Error waiting for elements: {e}")
-
-    def extract_iframe_content(self):
-        """Extract content from all iframes on the page."""
-        iframe_contents = []
-
-        # Find all iframe elements
-        iframes = self.driver.find_elements(By.TAG_NAME, "iframe")
-        print(f"Found {len(iframes)} iframes on the page.")
-
-        for index, iframe in enumerate(iframes):
-            try:
-                # Switch to iframe context
-                self.driver.switch_to.frame(iframe)
-                print(f"Switched to iframe #{index + 1}")
-
-                # Extract iframe content
-                iframe_content = self.driver.page_source
-                iframe_contents.append(iframe_content)
-            except Exception as e:
-                print(f"Error accessing iframe #{index + 1}: {e}")
-            finally:
-                # Switch back to the main content
-                self.driver.switch_to.default_content()
-
-        return iframe_contents
-
-    def make_hidden_elements_visible(self):
-        """Make hidden elements visible."""
-        try:
-            self.driver.execute_script("""
-                let elements = document.querySelectorAll('[style*="display: none"]');
-                for (let el of elements) {
-                    el.style.display = 'block';
-                }
-            """)
-        except Exception as e:
-            print(f"Error making hidden elements visible: {e}")
-
-    def extract_shadow_dom_content(self, shadow_host_selector):
-        """Extract content from a Shadow DOM."""
-        try:
-            shadow_host = self.driver.find_element(By.CSS_SELECTOR, shadow_host_selector)
-            shadow_root = self.driver.execute_script("return arguments[0].shadowRoot", shadow_host)
-            return shadow_root.get_attribute('innerHTML')
-        except Exception as e:
-            print(f"Error extracting Shadow DOM content: {e}")
-            return ""
-
-    def fetch_web_page(self, url):
+        if self.owns_pool:
+            self.driver_pool.close()
+        self.link_probe.close()
+        if self.owns_cache:
+            self.page_cache.close()
+
+    def domain_slot(self, url):
+        """Return the semaphore limiting concurrent fetches against the url's domain."""
+        netloc = urlparse(url).netloc
+        with self.domain_slots_lock:
+            if netloc not in self.domain_slots:
+                self.domain_slots[netloc] = threading.BoundedSemaphore(self.max_per_domain)
+            return self.domain_slots[netloc]
+
+    def fetch_web_page(self, driver, url):
         """Fetch and render a web page using Selenium."""
         print(f"Attempting to fetch: {url}")
         try:
-            self.driver.get(url)
-            # Increase load time and scroll dynamically
-            self.scroll_until_loaded()
-
-            # Wait for all elements to load
-            self.wait_for_elements()
+            self.readiness.prepare(driver)
+            driver.get(url)
 
-            # Handle lazy loading by scrolling to elements
-            lazy_elements = self.driver.find_elements(By.CSS_SELECTOR, ".lazy-load")
-            for element in lazy_elements:
-                self.driver.execute_script("arguments[0].scrollIntoView(true);", element)
-                time.sleep(1)
+            # Wait until the network, DOM and layout settle instead of sleeping fixed intervals
+            metrics = self.readiness.wait(driver, url)
 
-            # Make hidden elements visible
-            self.make_hidden_elements_visible()
-
-            # Extract content from iFrames
-            iframe_contents = self.extract_iframe_content()
+            # Handle lazy loading with whatever remains of the page's time budget
+            lazy_metrics = self.readiness.load_lazy_elements(
+                driver, url, budget=max(self.readiness.budget - metrics["waited"], 0)
+            )
+            if lazy_metrics:
+                metrics["waited"] = round(metrics["waited"] + lazy_metrics["waited"], 3)
+                metrics["reason"] = lazy_metrics["reason"]
 
-            # Capture the main page source
-            main_page_content = self.driver.page_source
+            with self.results_lock:
+                self.readiness_metrics.append(metrics)
+            print(f"Page ready after {metrics['waited']}s ({metrics['reason']}): {url}")
 
-            # Merge iframe content with main page content
-            all_content = main_page_content + "\n".join(iframe_contents)
+            # Capture the page, shadow roots and same-origin iframes in a single round-trip
+            all_content = take_snapshot(driver)
 
             print(f"Successfully fetched: {url}")
             return all_content
@@ -156,71 +157,358 @@ class Crawler:
             print(f"Error fetching the URL {url}: {e}")
             return None
 
+    def fetch_static_page(self, url, headers=None):
+        """Fetch a page with a plain HTTP GET, returning the response (error statuses included) or None if none came."""
+        try:
+            response = get_session().get(url, headers=headers, timeout=10)
+        except requests.RequestException as e:
+            print(f"Static fetch failed for {url}: {e}")
+            return None
+        if response.status_code >= 400:
+            print(f"Static fetch failed for {url}: HTTP {response.status_code}")
+        return response
+
+    def static_html(self, response):
+        """Return the body of a static response if it is usable HTML, otherwise None."""
+        if response is None or not response.ok:
+            return None
+        if "html" not in response.headers.get("Content-Type", "html"):
+            return None
+        return response.text
+
+    def looks_js_driven(self, html_content, menu_page=False):
+        """
+        Guess whether a statically fetched page only renders its content with JavaScript, returning
+        the reason it looks that way or None. Menu signals are looked for outside nav, header, footer
+        and links, since those repeat "Menu", "Lunch" or "Wine" on every page of a restaurant site.
+        """
+        soup = BeautifulSoup(html_content, 'html.parser')
+        script_chars = sum(
+            len(tag.get_text()) for tag in soup("script")
+            if not tag.get("src") and tag.get("type", "text/javascript") in ("text/javascript", "module")
+        )
+        for tag in soup(["script", "style", "noscript", "template"]):
+            tag.decompose()
+
+        body = soup.body or soup
+        for tag in body(CHROME_TAGS):
+            tag.decompose()
+        empty_mount = body.find(lambda tag: tag.name in MOUNT_TAGS and is_mount_node(tag))
+        for tag in body("a"):
+            tag.decompose()
+        content_text = body.get_text(" ", strip=True)
+
+        if len(content_text) < MIN_STATIC_TEXT_LENGTH:
+            return "thin_text"
+        if SPA_ROOT_PATTERN.search(html_content) and len(content_text) < 4 * MIN_STATIC_TEXT_LENGTH:
+            return "spa_root"
+        if empty_mount is not None:
+            return "empty_mount"
+        if script_chars > SCRIPT_TEXT_RATIO * len(content_text):
+            return "script_heavy"
+        if not MENU_TEXT_PATTERN.search(content_text):
+            return "no_menu_text"
+        if menu_page and not PRICE_PATTERN.search(content_text):
+            return "no_prices"
+        return None
+
+    def fetch_page(self, url):
+        """Fetch a page over plain HTTP, escalating to a Selenium render only when needed."""
+        netloc = urlparse(url).netloc
+
+        with self.domain_slot(url):
+            cached = self.page_cache.get(url) if self.page_cache else None
+
+            # The sitemap says the page hasn't changed since it was cached, so skip even the revalidation;
+            # the TTL still runs from the last real fetch in case the sitemap is stale
+            lastmod = self.sitemap_lastmod.get(url)
+            if cached and lastmod is not None and lastmod <= cached["fetched_at"]:
+                self.page_cache.touch(url, revalidated=False)
+                print(f"Reused cached page unchanged since sitemap lastmod: {url}")
+                return cached["html"]
+
+            # Every page gets a (conditional) GET first, even on render-tier domains: a 304 or unchanged
+            # body skips Chrome, and a rendered page is cached with this response's validators
+            headers = self.page_cache.conditional_headers(cached) if cached else None
+            response = self.fetch_static_page(url, headers=headers)
+            if self.page_cache and self.page_cache.is_unchanged(cached, response):
+                self.page_cache.touch(url)
+                print(f"Reused cached page: {url}")
+                return cached["html"]
+            if cached and (response is None or response.status_code >= 500):
+                # Couldn't revalidate (timeout, connection or server error); a copy inside its TTL beats nothing.
+                # A 4xx means the page itself is gone or forbidden, so the copy isn't served then
+                self.page_cache.touch(url, revalidated=False)
+                print(f"Serving cached page after failed revalidation: {url}")
+                return cached["html"]
+
+            html_content = self.static_html(response)
+            rendered_domain = self.domain_tiers.get(netloc) == "render"
+            # A non-HTML resource, or a failed fetch on a static domain, says nothing about how the site renders;
+            # render-tier domains still get Chrome when the plain GET fails, since some block non-browser clients
+            if html_content is None and (response is not None and response.ok or not rendered_domain):
+                print(f"Skipping {url}: no HTML from static fetch")
+                return None
+
+            if not rendered_domain:
+                reason = self.looks_js_driven(html_content, menu_page=self.frontier.score(url) >= MENU_PAGE_SCORE)
+                if reason is None:
+                    self.domain_tiers.setdefault(netloc, "static")
+                    print(f"Fetched statically: {url}")
+                    if self.page_cache:
+                        self.page_cache.store(url, html_content, response)
+                    return html_content
+
+                if reason == "no_prices":
+                    # A menu page without prices may just link to PDFs, so only this page is rendered
+                    print(f"Rendering {url}: menu page without prices")
+                else:
+                    # Only real HTML that needs JavaScript escalates; later pages on this domain go straight to Chrome
+                    print(f"Escalating {netloc} to a rendered fetch ({reason})")
+                    self.domain_tiers[netloc] = "render"
+
+            with self.driver_pool.driver() as driver:
+                html_content = self.fetch_web_page(driver, url)
+            if self.page_cache:
+                self.page_cache.store(url, html_content, response)
+            return html_content
+
     def extract_links(self, current_url, html_content):
-        """Extract all links from the given HTML content."""
+        """Extract all links, and any iframes not already inlined, from the given HTML content."""
         print(f"Extracting links from: {current_url}")
         soup = BeautifulSoup(html_content, 'html.parser')
-        links = set()
-        
+        links = {}  # url -> anchor text
+
         for a_tag in soup.find_all('a', href=True):
             href = a_tag['href']
             if not href or href.startswith("#"):  # Skip empty or fragment-only links
                 continue
             try:
                 full_url = urljoin(current_url, href)
-                links.add(full_url)
+                anchor_text = a_tag.get_text(" ", strip=True) or a_tag.get("title", "")
+                links[full_url] = f"{links.get(full_url, '')} {anchor_text}".strip()
             except Exception as e:
                 print(f"Error resolving link {href}: {e}")
-        
-        return links
+
+        # Frames the snapshot could not inline (cross-origin, or a static page) are fetched on their own
+        frames = {
+            urljoin(current_url, iframe['src']) for iframe in soup.find_all('iframe', src=True)
+            if not iframe.has_attr('data-snapshot-flattened') and iframe['src'].startswith(("http", "/"))
+        }
+
+        return links, frames
+
+    def page_text(self, html_content):
+        """
+        Return the visible text of a page's own content, used to fingerprint it for duplicate detection.
+        Nav, header, footer and similar chrome are left out, and <main> is used when the page marks one.
+        """
+        soup = BeautifulSoup(html_content, 'html.parser')
+        for tag in soup(["script", "style", "noscript", "template"] + CHROME_TAGS):
+            tag.decompose()
+        for tag in soup.find_all(attrs={"role": CHROME_ROLES}):
+            tag.decompose()
+        for tag in soup.find_all(lambda tag: CHROME_NAMES.intersection(tag.get("class", []) + [tag.get("id", "")])):
+            tag.decompose()
+        main = soup.find("main") or soup.find(attrs={"role": "main"})
+        return (main or soup).get_text(" ", strip=True)
 
     def get_content_type(self, url):
         """Fetch the content type of a URL."""
-        try:
-            response = requests.head(url, allow_redirects=True, timeout=5)
-            return response.headers.get("Content-Type", "")
-        except requests.RequestException as e:
-            print(f"Error fetching content type for {url}: {e}")
-            return ""
+        return self.link_probe.get_content_type(url)
+
+    def crawl_page(self, url, depth):
+        """Crawl a single page, queue its PDFs and relevant links, and return (url, html)."""
+        # Links like /menu?download=1 were queued as pages while their probe ran; confirmed PDFs are only collected
+        if self.link_probe.is_pdf(url):
+            print(f"Not crawling {url}: it serves a PDF")
+            return url, None
 
-    def crawl_page(self, url):
-        """Crawl a single page and extract relevant links and PDFs."""
-        if url in self.visited:
-            return
+        html_content = self.fetch_page(url)
 
-        self.visited.add(url)
-        html_content = self.fetch_web_page(url)
-        self.relevant_links.add((url, html_content))
+        with self.results_lock:
+            self.bytes_fetched += len(html_content or "")
 
         if html_content is None:
             print(f"No html content was found for {url}")
-            return
+            return url, None
 
-        links = self.extract_links(url, html_content)
+        links, frames = self.extract_links(url, html_content)
 
-        # Identify PDF links
-        pdf_links = {
-            link for link in links
-            if link.lower().endswith('.pdf') and "application/pdf" in self.get_content_type(link)
+        # Probe the most menu-like possible PDF links in the background; results are gathered when the crawl ends
+        pdf_candidates = {
+            link: self.frontier.score(link, anchor_text, depth + 1)
+            for link, anchor_text in links.items() if self.link_probe.is_candidate(link)
         }
-        for pdf_link in pdf_links:
-            self.pdf_links.add((pdf_link, None)) 
-
-        print(f"PDF links found on {url}: {len(pdf_links)}")
+        self.probe_pdf_candidates(pdf_candidates)
+        print(f"PDF candidates found on {url}: {len(pdf_candidates)}")
 
-        # Identify relevant links
-        relevant_links = [link for link in list(links) if "menu" in link and self.core_link in link]
+        # Queue same-domain pages; the frontier scores them and drops irrelevant ones
+        start_host = canonical_host(self.start_url)
+        for link, anchor_text in links.items():
+            if link in pdf_candidates and link.lower().endswith(".pdf"):
+                continue
+            if canonical_host(link) == start_host:
+                self.frontier.push(link, depth + 1, anchor_text)
 
-        for link in relevant_links:
-            if urlparse(link).netloc == urlparse(self.start_url).netloc:
-                self.crawl_page(link)
+        # Embedded menu widgets are often served from another domain, so frames skip the domain check
+        for frame in frames:
+            if FRAME_DENYLIST_PATTERN.search(urlparse(frame).hostname or ""):
+                continue
+            self.frontier.push(frame, depth + 1, score=FRAME_SCORE)
+
+        # The same menu is often served under several paths; only the first copy is extracted, but its
+        # links were queued above in case the match was a false positive
+        duplicate_of = self.fingerprints.add(url, self.page_text(html_content))
+        if duplicate_of:
+            print(f"Dropping {url} as a duplicate of {duplicate_of}")
+            with self.results_lock:
+                self.duplicates.append((url, duplicate_of))
+            return url, None
+
+        return url, html_content
+
+    def probe_pdf_candidates(self, candidates):
+        """
+        Probe PDF candidates, given as url -> frontier score, best first: low scorers are skipped
+        and at most max_pdf_probes are probed per crawl, since each confirmed PDF is downloaded and parsed.
+        """
+        for url in sorted(candidates, key=candidates.get, reverse=True):
+            with self.results_lock:
+                if url in self.pdf_probed:
+                    continue
+                if candidates[url] <= self.frontier.min_score:
+                    reason = "low_score"
+                elif len(self.pdf_probed) >= self.max_pdf_probes:
+                    reason = "pdf_budget"
+                else:
+                    reason = None
+                    self.pdf_probed.add(url)
+                    self.pdf_skipped.discard(url)
+                if reason and url not in self.pdf_skipped:
+                    self.pdf_skipped.add(url)
+                    self.frontier.skipped.append((url, reason))
+            if reason is None:
+                self.link_probe.submit(url)
+
+    def budget_exhausted(self):
+        """Return the name of the first crawl budget that has run out, or None."""
+        if self.max_pages is not None and self.pages_started >= self.max_pages:
+            return "page_budget"
+        if self.max_bytes is not None and self.bytes_fetched >= self.max_bytes:
+            return "byte_budget"
+        if self.max_seconds is not None and time.time() - self.crawl_started_at >= self.max_seconds:
+            return "time_budget"
+        return None
+
+    def seed_from_sitemaps(self):
+        """Queue menu-relevant pages and PDFs listed in the site's sitemaps before any rendering."""
+        start_host = canonical_host(self.start_url)
+        discovered = SiteDiscovery(self.start_url).discover()
+
+        seeded = 0
+        pdf_candidates = {}
+        for url, lastmod in discovered:
+            if canonical_host(url) != start_host:
+                continue
+            if url.lower().endswith(".pdf"):
+                pdf_candidates[url] = self.frontier.score(url, depth=1)
+            elif self.frontier.push(url, 1):
+                seeded += 1
+                self.sitemap_lastmod[url] = parse_lastmod(lastmod)
+        # Sitemaps list every document on the site; only the menu-looking ones are worth downloading
+        self.probe_pdf_candidates(pdf_candidates)
+        print(f"Seeded {seeded} pages and {len(pdf_candidates)} PDF candidates from sitemaps")
+
+    def iter_pages(self):
+        """
+        Crawl from the start URL, most relevant pages first, rendering up to pool_size at once.
+        Yields (url, html) as each page finishes so callers can process pages while crawling
+        continues; the crawler keeps no reference to the html. PDF links are in self.pdf_links
+        once the generator is exhausted.
+        """
+        self.crawl_started_at = time.time()
+        self.resource_stats_start = self.resource_filter.get_stats() if self.resource_filter else {}
+        self.frontier.push(self.start_url, 0, score=float("inf"))
+        if self.use_sitemaps:
+            self.seed_from_sitemaps()
+
+        with ThreadPoolExecutor(max_workers=self.pool_size) as executor:
+            pending = set()
+            while True:
+                # Keep every worker busy while the frontier has work and the budgets allow it
+                while len(pending) < self.pool_size:
+                    exhausted = self.budget_exhausted()
+                    if exhausted:
+                        self.frontier.drain(exhausted)
+                        break
+                    next_page = self.frontier.pop()
+                    if next_page is None:
+                        break
+                    self.pages_started += 1
+                    pending.add(executor.submit(self.crawl_page, *next_page))
+
+                if not pending:
+                    break
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        page = future.result()
+                    except Exception as e:
+                        print(f"Error crawling page: {e}")
+                        continue
+                    yield page
+
+        self.collect_pdf_links()
+        print(f"Crawl report: {self.get_crawl_report()}")
 
     def crawl(self):
-        """Start crawling from the start URL."""
-        self.crawl_page(self.start_url)
+        """Crawl the whole site and return every page's html at once."""
+        for url, html_content in self.iter_pages():
+            self.relevant_links.add((url, html_content))
 
         return self.get_results()
 
+    def collect_pdf_links(self):
+        """Wait for outstanding content-type probes and record every confirmed PDF."""
+        pdf_links = self.link_probe.pdf_links()
+        with self.results_lock:
+            for pdf_link in pdf_links:
+                self.pdf_links.add((pdf_link, None))
+        print(f"PDF links found: {len(pdf_links)}")
+
+    def get_resource_stats(self):
+        """Return blocked-request and loaded-byte counts from the resource filter since this crawl began."""
+        if not self.resource_filter:
+            return {}
+        stats = self.resource_filter.get_stats()
+        start_blocked = self.resource_stats_start.get("blocked_requests", {})
+        blocked = {
+            resource_type: count - start_blocked.get(resource_type, 0)
+            for resource_type, count in stats["blocked_requests"].items()
+            if count > start_blocked.get(resource_type, 0)
+        }
+        return {
+            "blocked_requests": blocked,
+            "blocked_total": sum(blocked.values()),
+            "loaded_bytes": stats["loaded_bytes"] - self.resource_stats_start.get("loaded_bytes", 0),
+        }
+
+    def get_crawl_report(self):
+        """Summarize what the crawl covered and which urls it skipped and why."""
+        skipped_by_reason = {}
+        for url, reason in self.frontier.skipped:
+            skipped_by_reason.setdefault(reason, []).append(url)
+        return {
+            "pages": self.pages_started,
+            "bytes": self.bytes_fetched,
+            "seconds": round(time.time() - self.crawl_started_at, 3) if self.crawl_started_at else 0,
+            "skipped": skipped_by_reason,
+            "duplicates": list(self.duplicates),
+            "resources": self.get_resource_stats(),
+        }
+
     def get_results(self):
         """Return relevant links and PDF links as (link, content) pairs."""
         return list(self.relevant_links), list(self.pdf_links)
@@ -0,0 +1,65 @@
+# Serializes the rendered document in one WebDriver call:
+# - inline display:none elements are made visible first
+# - open shadow roots are appended as <div data-snapshot-shadow> sections
+# - same-origin iframes are appended as <div data-snapshot-frame> sections and their <iframe>
+#   tags marked data-snapshot-flattened, so cross-origin frames are the only ones left to fetch
+# Sections are appended inside a copy of <body>: HTML parsers (lxml included) drop anything after </html>
+SNAPSHOT_SCRIPT = """
+const MAX_FRAME_DEPTH = 3;
+
+function revealHidden(root) {
+    for (const el of root.querySelectorAll('[style*="display: none"]')) {
+        el.style.display = 'block';
+    }
+}
+
+function collectShadowRoots(root, found) {
+    for (const el of root.querySelectorAll('*')) {
+        if (el.shadowRoot) {
+            found.push(el.shadowRoot);
+            collectShadowRoots(el.shadowRoot, found);
+        }
+    }
+    return found;
+}
+
+function snapshotDocument(doc, depth) {
+    revealHidden(doc);
+    const sections = [];
+
+    for (const shadow of collectShadowRoots(doc, [])) {
+        revealHidden(shadow);
+        sections.push('<div data-snapshot-shadow="1">' + shadow.innerHTML + '</div>');
+    }
+
+    for (const frame of doc.querySelectorAll('iframe')) {
+        let frameDoc = null;
+        try {
+            frameDoc = frame.contentDocument;
+        } catch (e) {
+            frameDoc = null;  // Cross-origin; the crawler fetches it separately
+        }
+        if (frameDoc && frameDoc.documentElement && depth < MAX_FRAME_DEPTH) {
+            frame.setAttribute('data-snapshot-flattened', '1');
+            sections.push(
+                '<div data-snapshot-frame="' + (frame.src || '').replace(/"/g, '&quot;') + '">' +
+                snapshotDocument(frameDoc, depth + 1) + '</div>'
+            );
+        }
+    }
+
+    // Work on a copy so the live page the crawler may still inspect is left untouched
+    const root = doc.documentElement.cloneNode(true);
+    const body = root.querySelector('body') || root;
+    body.insertAdjacentHTML('beforeend', sections.join('\\n'));
+    // A nested frame contributes only its body, so the result never holds a second <html>
+    return depth ? body.innerHTML : root.outerHTML;
+}
+
+return snapshotDocument(document, 0);
+"""
+
+
+def take_snapshot(driver) -> str:
+    """Return the page, its open shadow roots and same-origin iframes as one html string."""
+    return driver.execute_script(SNAPSHOT_SCRIPT)
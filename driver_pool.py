@@ -0,0 +1,210 @@
+import time
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+
+
+def create_driver(resource_filter=None):
+    """Setup Selenium WebDriver with Headless Chrome."""
+    print("🔧 Initializing Selenium WebDriver...")
+
+    # Define paths for Chrome and ChromeDriver
+    chromium_path = "/usr/bin/google-chrome"  # Use the standard system-installed Chrome path
+    driver_path = "/usr/bin/chromedriver"  # Standard location for ChromeDriver
+
+    # Set Chrome options
+    chrome_options = Options()
+    chrome_options.binary_location = chromium_path
+    chrome_options.add_argument("--headless")  # Run in headless mode
+    chrome_options.add_argument("--no-sandbox")  # Required for AWS Lambda/EC2
+    chrome_options.add_argument("--disable-dev-shm-usage")  # Avoid shared memory issues
+    chrome_options.add_argument("--disable-gpu")  # Disable GPU hardware acceleration
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")  # Reduce bot detection
+    chrome_options.add_argument("--disable-infobars")  # Remove the Chrome info bar
+    chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})  # DevTools events for network-idle tracking
+    if resource_filter:
+        resource_filter.configure_options(chrome_options)
+
+    print(f"✅ Launching WebDriver with Chrome at {chromium_path} and Driver at {driver_path}")
+
+    # Initialize the WebDriver and block unneeded downloads before its first page load
+    driver = webdriver.Chrome(service=Service(driver_path), options=chrome_options)
+    if resource_filter:
+        resource_filter.apply(driver)
+    return driver
+
+
+class DriverPool:
+    '''
+    A fixed-size pool of warm headless Chrome drivers, shared by crawler workers and across jobs
+
+    size: int # maximum number of drivers alive at once
+    resource_filter: ResourceFilter # optional blocklist installed on every launched driver
+    recycle_after: int # pages a driver may serve before it is quit to reclaim Chrome memory
+    Drivers are launched lazily, so a crawl that never needs a browser never starts one.
+    Borrowed drivers are health-checked and replaced if Chrome has died.
+    '''
+    def __init__(
+        self,
+        size: int = 4,
+        resource_filter=None,
+        recycle_after: int = 50
+    ):
+        self.size = size
+        self.resource_filter = resource_filter
+        self.recycle_after = recycle_after
+        self.idle = []  # Reuse the most recently returned (warmest) driver first
+        self.alive = {}  # driver -> pages served since launch
+        self.origins = {}  # driver -> origins visited since the last reset
+        self.launching = 0
+        self.condition = threading.Condition()
+        self.startup_times = []
+        self.recycle_count = 0
+        self.health_failures = 0
+
+    def launch(self):
+        """Start a new driver in a slot already reserved by acquire."""
+        start_time = time.time()
+        try:
+            driver = create_driver(self.resource_filter)
+        except Exception:
+            with self.condition:
+                self.launching -= 1
+                self.condition.notify()
+            raise
+
+        with self.condition:
+            self.launching -= 1
+            self.alive[driver] = 0
+            self.origins[driver] = set()
+            self.startup_times.append(time.time() - start_time)
+        return driver
+
+    def is_healthy(self, driver) -> bool:
+        """Check that the driver's browser still answers commands."""
+        try:
+            return driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def retire(self, driver):
+        """Quit a driver and free its slot for a fresh launch."""
+        with self.condition:
+            self.alive.pop(driver, None)
+            self.origins.pop(driver, None)
+            self.condition.notify()
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"Error quitting WebDriver: {e}")
+
+    def acquire(self):
+        """Borrow a healthy driver, launching one if the pool has not reached its size."""
+        while True:
+            with self.condition:
+                while not self.idle and len(self.alive) + self.launching >= self.size:
+                    self.condition.wait()
+                if self.idle:
+                    driver = self.idle.pop()
+                else:
+                    # Reserve the slot before the slow launch so other threads don't overshoot
+                    self.launching += 1
+                    driver = None
+
+            if driver is None:
+                return self.launch()
+            if self.is_healthy(driver):
+                return driver
+
+            print("♻️ Replacing unresponsive WebDriver")
+            with self.condition:
+                self.health_failures += 1
+            self.retire(driver)
+
+    def release(self, driver):
+        """Return a borrowed driver, recycling it once it has served recycle_after pages."""
+        try:
+            current_url = driver.current_url
+        except Exception:
+            current_url = ""
+
+        with self.condition:
+            if driver not in self.alive:
+                return
+            self.alive[driver] += 1
+            origin = "{0.scheme}://{0.netloc}".format(urlparse(current_url))
+            if current_url.startswith("http"):
+                self.origins[driver].add(origin)
+            recycle = self.alive[driver] >= self.recycle_after
+            if recycle:
+                self.recycle_count += 1
+            else:
+                self.idle.append(driver)
+                self.condition.notify()
+
+        if recycle:
+            print(f"♻️ Recycling WebDriver after {self.recycle_after} pages")
+            self.retire(driver)
+
+    @contextmanager
+    def driver(self):
+        """Borrow a driver for the duration of a with-block."""
+        driver = self.acquire()
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def reset(self):
+        """Clear cookies, storage and cache on idle drivers so the next job starts with a clean profile."""
+        with self.condition:
+            drivers = list(self.idle)
+            self.idle = []
+
+        for driver in drivers:
+            try:
+                driver.get("about:blank")
+                driver.delete_all_cookies()
+                driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+                driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+                for origin in self.origins.get(driver, ()):
+                    driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+            except Exception as e:
+                print(f"Error resetting WebDriver profile: {e}")
+                self.retire(driver)
+                continue
+
+            with self.condition:
+                self.origins[driver] = set()
+                self.idle.append(driver)
+                self.condition.notify()
+
+    def get_metrics(self) -> dict:
+        """Return pool size, startup and recycling statistics."""
+        with self.condition:
+            return {
+                "size": self.size,
+                "alive": len(self.alive),
+                "idle": len(self.idle),
+                "launches": len(self.startup_times),
+                "avg_startup_seconds": round(sum(self.startup_times) / len(self.startup_times), 3) if self.startup_times else 0,
+                "recycles": self.recycle_count,
+                "health_failures": self.health_failures,
+            }
+
+    def close(self):
+        """Quit every driver the pool has launched."""
+        with self.condition:
+            drivers = list(self.alive)
+            self.alive = {}
+            self.origins = {}
+            self.idle = []
+            self.condition.notify_all()
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception as e:
+                print(f"Error quitting WebDriver: {e}")
@@ -0,0 +1,119 @@
+import re
+import heapq
+import itertools
+import threading
+from urllib.parse import urlparse, parse_qs
+from url_canon import canonicalize_url
+
+# Relevance of a url/anchor token to finding menu content
+TOKEN_WEIGHTS = {
+    "menu": 5, "menus": 5,
+    "food": 3, "dinner": 3, "lunch": 3, "brunch": 3, "breakfast": 3, "drinks": 3, "drink": 3,
+    "wine": 2, "wines": 2, "cocktails": 2, "cocktail": 2, "beer": 2, "beers": 2, "bar": 2,
+    "dessert": 2, "desserts": 2, "specials": 2, "happy": 2, "kitchen": 1, "eat": 1,
+    "catering": 1, "order": 1, "takeout": 1, "pdf": 2, "download": 1,
+    "login": -5, "signin": -5, "account": -4, "cart": -4, "checkout": -4, "privacy": -5,
+    "terms": -5, "policy": -4, "careers": -4, "jobs": -4, "press": -3, "blog": -2,
+    "gift": -3, "cards": -1, "reservations": -1, "contact": -1, "events": -1, "gallery": -2,
+}
+TOKEN_SPLIT_PATTERN = re.compile(r"[^a-z0-9]+")
+PAGE_NUMBER_PATTERN = re.compile(r"(?:^|[/?&_-])(?:page|p|pg)[=/_-]?(\d+)", re.IGNORECASE)
+
+DEPTH_PENALTY = 1.5
+ANCHOR_WEIGHT = 1.5  # Anchor text is usually a better signal than the url slug
+PDF_BONUS = 4
+
+
+class CrawlFrontier:
+    '''
+    Priority queue of (url, depth) pairs, expanding the most menu-relevant links first
+
+    max_depth: int # links deeper than this are never enqueued
+    min_score: float # links scoring at or below this are skipped
+    Every url is accepted at most once, compared by its canonical form, so the frontier also
+    acts as the visited set.
+    Urls that are rejected or never expanded are recorded in `skipped` with a reason.
+    '''
+    def __init__(
+        self,
+        max_depth: int,
+        min_score: float = 0.0
+    ):
+        self.max_depth = max_depth
+        self.min_score = min_score
+        self.heap = []
+        self.order = itertools.count()  # Tie-breaker keeping equal scores first-in first-out
+        self.seen = set()
+        self.skipped = []  # (url, reason) pairs
+        self.lock = threading.Lock()
+
+    def score(
+        self,
+        url: str,
+        anchor_text: str = "",
+        depth: int = 0
+    ) -> float:
+        """Score a link by its url tokens, anchor text, depth and PDF likelihood."""
+        parsed = urlparse(url.lower())
+        url_tokens = set(TOKEN_SPLIT_PATTERN.split(parsed.path + " " + parsed.query))
+        anchor_tokens = set(TOKEN_SPLIT_PATTERN.split(anchor_text.lower()))
+
+        score = sum(TOKEN_WEIGHTS.get(token, 0) for token in url_tokens)
+        score += ANCHOR_WEIGHT * sum(TOKEN_WEIGHTS.get(token, 0) for token in anchor_tokens)
+
+        if parsed.path.endswith(".pdf"):
+            score += PDF_BONUS
+
+        # Query-string variants and deep pagination rarely hold new menu items
+        score -= len(parse_qs(parsed.query))
+        page_number = PAGE_NUMBER_PATTERN.search(url)
+        if page_number:
+            score -= min(int(page_number.group(1)), 10) * 0.5
+
+        return score - DEPTH_PENALTY * depth
+
+    def push(
+        self,
+        url: str,
+        depth: int,
+        anchor_text: str = "",
+        score: float = None
+    ) -> bool:
+        """Enqueue a url unless it was seen before, is past max_depth or scores too low."""
+        key = canonicalize_url(url)
+        with self.lock:
+            if key in self.seen:
+                return False
+            self.seen.add(key)
+
+            if depth > self.max_depth:
+                self.skipped.append((url, "max_depth"))
+                return False
+
+            score = self.score(key, anchor_text, depth) if score is None else score
+            if score <= self.min_score:
+                self.skipped.append((url, "low_score"))
+                return False
+
+            heapq.heappush(self.heap, (-score, next(self.order), url, depth))
+            return True
+
+    def pop(self):
+        """Return the highest scoring pending (url, depth), or None when empty."""
+        with self.lock:
+            if not self.heap:
+                return None
+            _, _, url, depth = heapq.heappop(self.heap)
+            return url, depth
+
+    def drain(
+        self,
+        reason: str
+    ):
+        """Give up on every pending url, recording why."""
+        with self.lock:
+            self.skipped.extend((url, reason) for _, _, url, _ in sorted(self.heap))
+            self.heap = []
+
+    def __len__(self):
+        return len(self.heap)
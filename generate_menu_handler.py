@@ -1,5 +1,6 @@
 from crawler import Crawler
-from process_text import process_pdf, extract_content_from_html, chunk_text_data
+from process_text import process_pdf, extract_content_from_html
+from text_chunker import chunk_text_data
 from lib_types import MenuItemSmall, MenuItemLarge
 from openai_functions import *
 import re
@@ -21,8 +22,9 @@ class GenerateMenuHandler:
         "Cleaning and Refining all Menu Items ..."
     ]
     
-    def __init__(self, url: str, request_id: str):
+    def __init__(self, url: str, request_id: str, driver_pool=None):
         self.url = url.strip()
+        self.driver_pool = driver_pool
         # Use regex to extract the core part of the link (e.g., 'example')
         match = re.search(r"(?:https?://)?(?:www\.)?([^/]+)", self.url)
         if match:
@@ -77,7 +79,7 @@ class GenerateMenuHandler:
     
     def get_url_html_pairs(self):
         self.update_status(0)
-        crawler = Crawler(self.url)
+        crawler = Crawler(self.url, driver_pool=self.driver_pool)
         relevant_links, pdf_links = crawler.crawl()
         pdf_text = [process_pdf(link) for link, _ in pdf_links if link]
         pdf_text = [s for s in pdf_text if s]
@@ -89,7 +91,7 @@ class GenerateMenuHandler:
     
     def clean_url_html_pairs(self, pairs):
         self.update_status(1)
-        chunks = chunk_text_data(pairs, chunk_size=500)
+        chunks = list(chunk_text_data(pairs))
         return chunks
     
     def generate_menu_templates(self, chunks):
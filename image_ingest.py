@@ -0,0 +1,258 @@
+import io
+import os
+import re
+import time
+import threading
+import pytesseract
+from PIL import Image, ImageOps
+from process_pool import get_process_pool
+
+IMAGE_EXTENSIONS = [".jpg", ".jpeg", ".png", ".bmp", ".gif", ".tif", ".tiff", ".webp"]
+
+# Phone photos are 12MP+; tesseract gains nothing past ~3000px on the long side but memory and time keep growing
+MAX_IMAGE_SIDE = 3000
+# Small screenshots are upscaled so body text reaches the ~30px height tesseract reads best
+MIN_IMAGE_SIDE = 1200
+
+# Deskew search: angles tried on a small copy of the image, scored by how sharply text rows stand out
+SKEW_SAMPLE_SIDE = 800
+SKEW_MAX_DEGREES = 5.0
+SKEW_STEP_DEGREES = 0.5
+
+# Column segmentation
+COLUMN_GAP_FRACTION = 0.015  # a gutter must be at least this share of the page width...
+COLUMN_GAP_HEIGHTS = 1.5  # ...and this many text heights wide
+COLUMN_GAP_WORD_FRACTION = 0.02  # share of words allowed to cross a gutter (headings spanning columns)
+MIN_COLUMN_FRACTION = 0.1  # narrower bands are labels (item numbers, dietary tags) and stay with their neighbour
+
+PRICE_WORD_PATTERN = re.compile(r"^[$€£]?\d+(?:[.,]\d{1,2})?$")
+
+
+def load_image(
+    source,
+    max_side: int = MAX_IMAGE_SIDE
+) -> Image.Image:
+    """Open an image (a path or its bytes) upright, in grayscale, with its long side within [MIN_IMAGE_SIDE, max_side]."""
+    image = Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+    # JPEGs decode straight to grayscale, and at 1/2, 1/4 or 1/8 scale when that still leaves
+    # max_side pixels, so a huge photo never sits in memory in full color at full size
+    scale = min(1.0, max_side / max(image.size))
+    image.draft("L", (int(image.width * scale), int(image.height * scale)))
+    image = ImageOps.exif_transpose(image).convert("L")
+
+    long_side = max(image.size)
+    if long_side > max_side:
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+    elif long_side < MIN_IMAGE_SIDE:
+        scale = MIN_IMAGE_SIDE / long_side
+        image = image.resize((round(image.width * scale), round(image.height * scale)), Image.LANCZOS)
+    return image
+
+
+def row_profile_score(image: Image.Image) -> float:
+    """How sharply the rows of an inverted (text bright) image alternate between text and gaps."""
+    # Resizing to one pixel wide averages each row in C
+    profile = list(image.resize((1, image.height), Image.BOX).getdata())
+    return sum((a - b) ** 2 for a, b in zip(profile, profile[1:]))
+
+
+def estimate_skew(image: Image.Image) -> float:
+    """Return the rotation in degrees that best aligns text rows with the horizontal."""
+    sample = image.copy()
+    sample.thumbnail((SKEW_SAMPLE_SIDE, SKEW_SAMPLE_SIDE))
+    sample = ImageOps.invert(ImageOps.autocontrast(sample))
+
+    steps = int(SKEW_MAX_DEGREES / SKEW_STEP_DEGREES)
+    best_angle, best_score = 0.0, row_profile_score(sample)
+    for step in range(-steps, steps + 1):
+        angle = step * SKEW_STEP_DEGREES
+        if not angle:
+            continue
+        score = row_profile_score(sample.rotate(angle, resample=Image.BILINEAR, fillcolor=0))
+        if score > best_score:
+            best_angle, best_score = angle, score
+    return best_angle
+
+
+def preprocess(source) -> Image.Image:
+    image = load_image(source)
+    angle = estimate_skew(image)
+    if angle:
+        image = image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+    return image
+
+
+def ocr_words(image: Image.Image) -> list:
+    """Return the recognized words as dicts with their text and bounding box."""
+    try:
+        data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+    except pytesseract.TesseractNotFoundError as e:
+        # Unpicklable; raised as-is from a worker it would break the process pool shared with PDF ingestion
+        raise RuntimeError(str(e)) from None
+    words = []
+    for i, text in enumerate(data["text"]):
+        text = text.strip()
+        if text and float(data["conf"][i]) >= 0:
+            words.append({
+                "text": text,
+                "left": data["left"][i],
+                "top": data["top"][i],
+                "width": data["width"][i],
+                "height": data["height"][i],
+            })
+    return words
+
+
+def find_columns(
+    words: list,
+    page_width: int
+) -> list:
+    """
+    Split the page into [start, stop) x-ranges at vertical gutters that almost no word crosses.
+    Bands made up mostly of prices, or too narrow to be a column of text, are merged into
+    their neighbour, so a dish and its price stay together.
+    """
+    coverage = [0] * (page_width + 1)
+    for word in words:
+        for x in range(max(word["left"], 0), min(word["left"] + word["width"], page_width)):
+            coverage[x] += 1
+
+    heights = sorted(word["height"] for word in words)
+    min_gap = max(page_width * COLUMN_GAP_FRACTION, heights[len(heights) // 2] * COLUMN_GAP_HEIGHTS)
+    crossing = max(1, len(words) * COLUMN_GAP_WORD_FRACTION)
+
+    bands, start, gap_start = [], None, None
+    for x, count in enumerate(coverage):
+        if count > crossing:
+            if start is None:
+                start = x
+            elif gap_start is not None and x - gap_start >= min_gap:
+                bands.append([start, gap_start])
+                start = x
+            gap_start = None
+        elif start is not None and gap_start is None:
+            gap_start = x
+    if start is not None:
+        bands.append([start, gap_start if gap_start is not None else page_width])
+    if not bands:
+        return [(0, page_width)]
+
+    columns = []
+    for band in bands:
+        in_band = [word for word in words if band[0] <= word["left"] + word["width"] / 2 < band[1]]
+        mostly_prices = in_band and sum(bool(PRICE_WORD_PATTERN.match(word["text"])) for word in in_band) > len(in_band) / 2
+        if columns and (band[1] - band[0] < page_width * MIN_COLUMN_FRACTION or mostly_prices):
+            columns[-1][1] = band[1]
+        elif columns and columns[-1][1] - columns[-1][0] < page_width * MIN_COLUMN_FRACTION:
+            columns[-1][1] = band[1]
+        else:
+            columns.append(band)
+
+    # Stretch the columns to cover the page so words crossing a gutter still land somewhere
+    columns[0][0] = 0
+    for left, right in zip(columns, columns[1:]):
+        left[1] = right[0] = (left[1] + right[0]) // 2
+    columns[-1][1] = page_width + 1
+    return [tuple(column) for column in columns]
+
+
+def group_rows(words: list) -> list:
+    """Group words into visual rows by vertical overlap and return each row's text left to right."""
+    rows = []
+    for word in sorted(words, key=lambda word: word["top"]):
+        middle = word["top"] + word["height"] / 2
+        if rows and rows[-1]["top"] <= middle <= rows[-1]["bottom"]:
+            rows[-1]["words"].append(word)
+            rows[-1]["bottom"] = max(rows[-1]["bottom"], word["top"] + word["height"])
+        else:
+            rows.append({"top": word["top"], "bottom": word["top"] + word["height"], "words": [word]})
+    return [" ".join(word["text"] for word in sorted(row["words"], key=lambda word: word["left"])) for row in rows]
+
+
+def layout_text(
+    words: list,
+    page_width: int
+) -> str:
+    """Reassemble OCR'd words column by column, each row on its own line."""
+    if not words:
+        return ""
+    blocks = []
+    for start, stop in find_columns(words, page_width):
+        column = [word for word in words if start <= word["left"] + word["width"] / 2 < stop]
+        if column:
+            blocks.append("\n".join(group_rows(column)))
+    return "\n\n".join(blocks)
+
+
+def ocr_image(source) -> (str, dict):
+    """Preprocess and OCR one image, given as a path or its bytes; runs inside a pool worker."""
+    start_time = time.perf_counter()
+    image = preprocess(source)
+    preprocessed_time = time.perf_counter()
+    words = ocr_words(image)
+    text = layout_text(words, image.width)
+    return text, {
+        "preprocess_seconds": round(preprocessed_time - start_time, 3),
+        "ocr_seconds": round(time.perf_counter() - preprocessed_time, 3),
+        "size": image.size,
+        "words": len(words),
+    }
+
+
+class ImageIngestor:
+    '''
+    OCRs uploaded menu photos straight to layout-aware text on the shared process pool
+
+    Each image is turned upright, converted to grayscale, scaled into the range tesseract
+    reads best and deskewed before OCR. Words are then regrouped into columns and rows from
+    their bounding boxes, so multi-column menus read one column at a time and prices stay
+    on the same line as their dish.
+    '''
+    def submit(
+        self,
+        source
+    ):
+        """Schedule OCR of one image (a path or its bytes) and return a Future resolving to (text, timings)."""
+        return get_process_pool().submit(ocr_image, source)
+
+    def result(
+        self,
+        future,
+        name: str
+    ) -> str:
+        """Wait for a submitted image and return its text, or "" if OCR failed."""
+        try:
+            text, timings = future.result()
+            print(f"OCR'd {os.path.basename(name)}: {timings}")
+            return text
+        except Exception as e:
+            print(f"Error extracting text from image {name}: {e}")
+            return ""
+
+    def text_from_file(
+        self,
+        source,
+        name: str = None
+    ) -> str:
+        return self.result(self.submit(source), name or str(source))
+
+    def text_from_files(
+        self,
+        paths: list
+    ) -> list:
+        """OCR several images in parallel, returning their text in the order given."""
+        futures = [self.submit(path) for path in paths]
+        return [self.result(future, path) for path, future in zip(paths, futures)]
+
+
+_image_ingestor = None
+_image_ingestor_lock = threading.Lock()
+
+
+def get_image_ingestor() -> ImageIngestor:
+    """Return the process-wide image ingestor."""
+    global _image_ingestor
+    with _image_ingestor_lock:
+        if _image_ingestor is None:
+            _image_ingestor = ImageIngestor()
+        return _image_ingestor
@@ -0,0 +1,100 @@
+import re
+import threading
+from collections import Counter
+from typing import List
+
+SNIPPET_LENGTH = 100  # Only the start of a line is inspected
+
+# Every character str.isspace() (and so regex \s) accepts
+_WHITESPACE = "\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000"
+# Deleting letters, digits and whitespace in one C-level pass leaves exactly the "non-alphanumeric" characters
+_ALNUM_SPACE_DELETE = str.maketrans("", "", "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789" + _WHITESPACE)
+_BRACKETS = "{}[]"
+
+# Precompiled pattern rules; each is only run when a cheap substring check says it could match
+HTML_TAG_PATTERN = re.compile(r"<[a-zA-Z]+.*?>")
+BASE64_IMAGE_PATTERN = re.compile(r"data:image/[a-zA-Z]+;base64,")
+SCRIPT_PATTERN = re.compile(r"^!function|^window\.\w+|^{\"|^\[")
+KEY_VALUE_PATTERN = re.compile(r"\"[^\"]+\"\s*:\s*[^\s]+")
+
+RULES = [
+    "non_alphanumeric",
+    "html_tag",
+    "base64_image",
+    "no_spaces",
+    "script",
+    "brackets",
+    "key_value",
+]
+
+
+class LineClassifier:
+    '''
+    Decides which scraped lines are code, markup or data rather than human-readable content
+
+    Makes exactly the same keep/drop decisions as the original per-line heuristic in
+    filter_lines, with rules precompiled and character ratios computed in C. The first rule
+    a dropped line matches is counted in `rule_hits` so thresholds can be tuned.
+    non_alpha_ratio: float # drop lines where more than this share is punctuation/symbols
+    bracket_ratio: float # drop lines where more than this share is braces or brackets
+    max_unbroken_length: int # drop lines longer than this with no spaces
+    '''
+    def __init__(
+        self,
+        non_alpha_ratio: float = 0.4,
+        bracket_ratio: float = 0.2,
+        max_unbroken_length: int = 50
+    ):
+        self.non_alpha_ratio = non_alpha_ratio
+        self.bracket_ratio = bracket_ratio
+        self.max_unbroken_length = max_unbroken_length
+        self.rule_hits = Counter()  # Cumulative across every call, for tuning
+        self.lock = threading.Lock()
+
+    def match_rule(
+        self,
+        line: str
+    ) -> str:
+        """Return the name of the first rule marking the line as non-content, or None."""
+        snippet = line[:SNIPPET_LENGTH].strip()
+        length = max(len(snippet), 1)
+
+        if len(snippet.translate(_ALNUM_SPACE_DELETE)) / length > self.non_alpha_ratio:
+            return "non_alphanumeric"
+        if "<" in snippet and HTML_TAG_PATTERN.search(snippet):
+            return "html_tag"
+        if snippet.startswith("data:image/") and BASE64_IMAGE_PATTERN.match(snippet):
+            return "base64_image"
+        if len(snippet) > self.max_unbroken_length and " " not in snippet:
+            return "no_spaces"
+        if SCRIPT_PATTERN.match(snippet):
+            return "script"
+        if sum(snippet.count(c) for c in _BRACKETS) / length > self.bracket_ratio:
+            return "brackets"
+        if '"' in snippet and KEY_VALUE_PATTERN.search(snippet):
+            return "key_value"
+        return None
+
+    def is_non_content(
+        self,
+        line: str
+    ) -> bool:
+        return self.match_rule(line) is not None
+
+    def classify(
+        self,
+        lines: List[str]
+    ) -> (List[str], Counter):
+        """Split a page's lines in one call, returning (kept lines, per-rule hit counts)."""
+        kept = []
+        hits = Counter()
+        for line in lines:
+            rule = self.match_rule(line)
+            if rule is None:
+                kept.append(line)
+            else:
+                hits[rule] += 1
+
+        with self.lock:
+            self.rule_hits.update(hits)
+        return kept, hits
@@ -0,0 +1,245 @@
+'''
+Local classifier answering obvious keep/drop lines before they are sent to informed_deletion
+
+A multinomial naive Bayes model over hashed word n-grams, character trigrams and a few
+shape features, trained from the decisions informed_deletion has already made (logged
+by filter_lines). Only lines it is confident about are answered locally.
+
+Collect training data by running with LOG_LINE_DECISIONS=1, then train a model from the log:
+    python line_prefilter.py [decision_log.jsonl] [model.json]
+'''
+import os
+import re
+import sys
+import json
+import math
+import zlib
+import random
+import threading
+from typing import List
+
+LOG_LINE_DECISIONS = os.getenv("LOG_LINE_DECISIONS", "0") == "1"  # Opt-in: the log is only needed to (re)train
+LINE_DECISION_LOG = os.getenv("LINE_DECISION_LOG", "/tmp/menu_tool/line_decisions.jsonl")
+# Past this size the log is rotated to <log>.1, replacing the previous rotation, so it holds at most twice this
+LINE_DECISION_LOG_MAX_BYTES = int(os.getenv("LINE_DECISION_LOG_MAX_BYTES", str(64 * 1024 * 1024)))
+# While logging, this share of locally decided lines still goes to the LLM, so the log keeps labels for the
+# easy lines too and a retrained model isn't built only from the ones the last model was unsure about
+LINE_DECISION_SAMPLE = float(os.getenv("LINE_DECISION_SAMPLE", "0.05"))
+LINE_PREFILTER_MODEL = os.getenv("LINE_PREFILTER_MODEL", "/tmp/menu_tool/line_prefilter_model.json")
+KEEP_THRESHOLD = float(os.getenv("LINE_PREFILTER_KEEP", "0.98"))
+DROP_THRESHOLD = float(os.getenv("LINE_PREFILTER_DROP", "0.02"))
+MIN_TRAINING_LINES = 500  # Below this the model abstains on everything
+# Naive Bayes treats every overlapping n-gram as independent evidence, which makes long lines
+# look absurdly certain. Averaging the per-feature evidence and scaling it to this many
+# "effective" features keeps probabilities usable for thresholding.
+EVIDENCE_WEIGHT = 8
+
+HASH_BUCKETS = 2 ** 18
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+PRICE_PATTERN = re.compile(r"[$€£]\s?\d|\d+[.,]\d{2}\b")
+
+
+def line_features(line: str) -> List[int]:
+    """Hash a line's word unigrams/bigrams, character trigrams and shape features into buckets."""
+    text = line.lower().strip()
+    words = WORD_PATTERN.findall(text)
+    features = [f"w:{word}" for word in words]
+    features += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    padded = f" {text[:80]} "
+    features += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+
+    features.append(f"len:{min(len(words), 20)}")
+    if PRICE_PATTERN.search(text):
+        features.append("shape:price")
+    if "©" in text or "copyright" in text:
+        features.append("shape:copyright")
+    if text.startswith("image["):
+        features.append("shape:image")
+    return [zlib.crc32(feature.encode("utf-8")) % HASH_BUCKETS for feature in features]
+
+
+class LinePrefilter:
+    '''
+    Naive Bayes keep/drop model with an abstain band between the thresholds
+
+    keep_threshold: float # answer "keep" locally when P(keep) is at least this
+    drop_threshold: float # answer "drop" locally when P(keep) is at most this
+    sample_fraction: float # share of confident lines sent to the LLM anyway, to keep the training log unbiased
+    Lines in between go to the LLM. Counters of local and LLM decisions are kept for metrics.
+    '''
+    def __init__(
+        self,
+        keep_threshold: float = KEEP_THRESHOLD,
+        drop_threshold: float = DROP_THRESHOLD,
+        sample_fraction: float = LINE_DECISION_SAMPLE if LOG_LINE_DECISIONS else 0.0
+    ):
+        self.keep_threshold = keep_threshold
+        self.drop_threshold = drop_threshold
+        self.sample_fraction = sample_fraction
+        self.class_counts = [0, 0]  # [dropped, kept] training lines
+        self.feature_counts = [{}, {}]  # per class: bucket -> count
+        self.feature_totals = [0, 0]
+        self.stats = {"local_keep": 0, "local_drop": 0, "sent_to_llm": 0, "sampled": 0}
+        self.lock = threading.Lock()
+
+    @property
+    def trained(self) -> bool:
+        return sum(self.class_counts) >= MIN_TRAINING_LINES and all(self.class_counts)
+
+    def train(
+        self,
+        examples
+    ):
+        """Add (line, kept) pairs to the model."""
+        for line, kept in examples:
+            label = int(bool(kept))
+            self.class_counts[label] += 1
+            for bucket in line_features(line):
+                self.feature_counts[label][bucket] = self.feature_counts[label].get(bucket, 0) + 1
+                self.feature_totals[label] += 1
+
+    def predict_keep(
+        self,
+        line: str
+    ) -> float:
+        """Return P(keep) for a line."""
+        total = sum(self.class_counts)
+        buckets = line_features(line)
+        log_scores = []
+        for label in (0, 1):
+            denominator = self.feature_totals[label] + HASH_BUCKETS
+            counts = self.feature_counts[label]
+            evidence = sum(math.log((counts.get(bucket, 0) + 1) / denominator) for bucket in buckets)
+            prior = math.log((self.class_counts[label] + 1) / (total + 2))
+            log_scores.append(prior + EVIDENCE_WEIGHT * evidence / max(len(buckets), 1))
+
+        # Softmax over the two classes, shifted for numerical stability
+        top = max(log_scores)
+        drop_weight, keep_weight = (math.exp(score - top) for score in log_scores)
+        return keep_weight / (drop_weight + keep_weight)
+
+    def decide(
+        self,
+        lines: List[str]
+    ) -> list:
+        """Return True (keep), False (drop) or None (ask the LLM) for each line."""
+        sampled = 0  # Confident lines sent to the LLM anyway
+        if not self.trained:
+            decisions = [None] * len(lines)
+        else:
+            decisions = []
+            for line in lines:
+                probability = self.predict_keep(line)
+                confident = probability >= self.keep_threshold or probability <= self.drop_threshold
+                if confident and self.sample_fraction and random.random() < self.sample_fraction:
+                    sampled += 1
+                    decisions.append(None)
+                elif probability >= self.keep_threshold:
+                    decisions.append(True)
+                elif probability <= self.drop_threshold:
+                    decisions.append(False)
+                else:
+                    decisions.append(None)
+
+        with self.lock:
+            self.stats["local_keep"] += decisions.count(True)
+            self.stats["local_drop"] += decisions.count(False)
+            self.stats["sent_to_llm"] += decisions.count(None)
+            self.stats["sampled"] += sampled
+        return decisions
+
+    def get_metrics(self) -> dict:
+        """Return decision counts and the fraction of lines resolved without the LLM."""
+        with self.lock:
+            stats = dict(self.stats)
+        total = stats["local_keep"] + stats["local_drop"] + stats["sent_to_llm"]
+        stats["local_fraction"] = round((stats["local_keep"] + stats["local_drop"]) / total, 3) if total else 0.0
+        return stats
+
+    def save(
+        self,
+        path: str = LINE_PREFILTER_MODEL
+    ):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "class_counts": self.class_counts,
+                "feature_counts": self.feature_counts,
+                "feature_totals": self.feature_totals,
+            }, f)
+
+    @classmethod
+    def load(
+        cls,
+        path: str = LINE_PREFILTER_MODEL,
+        **kwargs
+    ) -> "LinePrefilter":
+        """Load a saved model; without one the prefilter abstains and every line goes to the LLM."""
+        prefilter = cls(**kwargs)
+        try:
+            with open(path, encoding="utf-8") as f:
+                model = json.load(f)
+        except (OSError, ValueError):
+            return prefilter
+
+        prefilter.class_counts = model["class_counts"]
+        prefilter.feature_counts = [{int(k): v for k, v in counts.items()} for counts in model["feature_counts"]]
+        prefilter.feature_totals = model["feature_totals"]
+        return prefilter
+
+
+_log_lock = threading.Lock()
+
+
+def log_decisions(
+    lines: List[str],
+    kept: List[str],
+    path: str = LINE_DECISION_LOG
+):
+    """Append the LLM's keep/drop decision for each line to the training log, when LOG_LINE_DECISIONS is on."""
+    if not LOG_LINE_DECISIONS:
+        return
+    remaining = {}
+    for line in kept:
+        remaining[line] = remaining.get(line, 0) + 1
+
+    records = []
+    for line in lines:
+        was_kept = remaining.get(line, 0) > 0
+        if was_kept:
+            remaining[line] -= 1
+        records.append(json.dumps({"line": line, "kept": was_kept}))
+
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with _log_lock:
+            if os.path.exists(path) and os.path.getsize(path) >= LINE_DECISION_LOG_MAX_BYTES:
+                os.replace(path, f"{path}.1")
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("\n".join(records) + "\n")
+    except OSError as e:
+        print(f"Error logging line decisions: {e}")
+
+
+def read_decisions(path: str = LINE_DECISION_LOG):
+    """Yield (line, kept) pairs from the decision log, starting with its rotated-out part if there is one."""
+    for part in (f"{path}.1", path):
+        if not os.path.exists(part):
+            continue
+        with open(part, encoding="utf-8") as f:
+            for row in f:
+                try:
+                    record = json.loads(row)
+                except ValueError:
+                    continue
+                yield record["line"], record["kept"]
+
+
+if __name__ == "__main__":
+    log_path = sys.argv[1] if len(sys.argv) > 1 else LINE_DECISION_LOG
+    model_path = sys.argv[2] if len(sys.argv) > 2 else LINE_PREFILTER_MODEL
+
+    prefilter = LinePrefilter()
+    prefilter.train(read_decisions(log_path))
+    prefilter.save(model_path)
+    print(f"Trained on {sum(prefilter.class_counts)} lines ({prefilter.class_counts[1]} kept), saved to {model_path}")
@@ -0,0 +1,105 @@
+import re
+import threading
+import requests
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from http_client import get_session
+
+# Links that may serve a PDF even though their path doesn't end in .pdf (e.g. /menu?download=1)
+PDF_HINT_PATTERN = re.compile(r"pdf|download|attachment|/files?/|/uploads?/|/documents?/", re.IGNORECASE)
+# Extensions that are never worth probing
+SKIP_EXTENSION_PATTERN = re.compile(r"\.(?:html?|php|aspx?|jpe?g|png|gif|webp|svg|css|js|mp4|zip)$", re.IGNORECASE)
+
+
+class LinkProbe:
+    '''
+    Resolves the content type of crawled links concurrently over the shared HTTP session
+
+    max_workers: int # probes in flight at once
+    timeout: float # seconds allowed per probe
+    Results are memoized per url for the life of the probe, so a PDF linked from every
+    page of a site is only requested once.
+    '''
+    def __init__(
+        self,
+        max_workers: int = 8,
+        timeout: float = 5
+    ):
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.probes = {}  # url -> Future resolving to its content type
+        self.lock = threading.Lock()
+
+    def is_candidate(
+        self,
+        url: str
+    ) -> bool:
+        """Decide whether a link could plausibly be a PDF and is worth probing."""
+        path = urlparse(url).path.lower()
+        if path.endswith(".pdf"):
+            return True
+        if SKIP_EXTENSION_PATTERN.search(path):
+            return False
+        return bool(PDF_HINT_PATTERN.search(url))
+
+    def fetch_content_type(
+        self,
+        url: str
+    ) -> str:
+        """Fetch the content type of a URL, sniffing the body when the headers don't say."""
+        session = get_session()
+        try:
+            response = session.head(url, allow_redirects=True, timeout=self.timeout)
+            content_type = response.headers.get("Content-Type", "")
+            if response.ok and content_type and "octet-stream" not in content_type:
+                return content_type
+
+            # Some servers reject HEAD or label downloads generically; peek at the body instead
+            with session.get(url, allow_redirects=True, timeout=self.timeout, stream=True) as response:
+                content_type = response.headers.get("Content-Type", "")
+                head = next(response.iter_content(chunk_size=5), b"")
+                if head.startswith(b"%PDF-"):
+                    return "application/pdf"
+                return content_type
+        except requests.RequestException as e:
+            print(f"Error fetching content type for {url}: {e}")
+            return ""
+
+    def submit(
+        self,
+        url: str
+    ):
+        """Start probing a url, or return the in-flight/finished probe for it."""
+        with self.lock:
+            if url not in self.probes:
+                self.probes[url] = self.executor.submit(self.fetch_content_type, url)
+            return self.probes[url]
+
+    def get_content_type(
+        self,
+        url: str
+    ) -> str:
+        """Return the (memoized) content type of a url, blocking until it is known."""
+        return self.submit(url).result()
+
+    def is_pdf(
+        self,
+        url: str
+    ) -> bool:
+        """Whether a submitted url was confirmed to serve a PDF, waiting for its probe; False if never probed."""
+        with self.lock:
+            probe = self.probes.get(url)
+        return probe is not None and "application/pdf" in probe.result()
+
+    def pdf_links(self) -> set:
+        """Wait for all submitted probes and return the urls that serve PDFs."""
+        with self.lock:
+            urls = list(self.probes)
+        return {url for url in urls if self.is_pdf(url)}
+
+    def close(self):
+        # shutdown(cancel_futures=True) needs Python 3.9 and the image runs 3.8, so cancel pending probes by hand
+        with self.lock:
+            for probe in self.probes.values():
+                probe.cancel()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,208 @@
+import os
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from openai import AsyncOpenAI
+from dotenv import load_dotenv
+from rate_limit import (
+    TokenBucket, estimate_tokens, is_retryable,
+    LLM_MAX_IN_FLIGHT, LLM_TOKENS_PER_MINUTE, LLM_REQUESTS_PER_MINUTE,
+)
+
+load_dotenv()
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+EXPECTED_OUTPUT_TOKENS = 500  # Budgeted per call on top of the prompt; corrected from usage afterwards
+MAX_RETRY_AFTER = 120  # Longest server-requested wait honored before giving up on that hint
+LATENCY_SAMPLES = 1000  # Most recent latencies kept per label for the mean and p95
+
+
+def retry_after(error: Exception) -> float:
+    """Seconds the server asked us to wait in Retry-After(-ms) headers, or None."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def prompt_tokens(messages: list) -> int:
+    return sum(estimate_tokens(str(message.get("content", ""))) for message in messages)
+
+
+class LLMGateway:
+    '''
+    Process-wide async OpenAI client that every LLM call goes through
+
+    Calls run on one background event loop, so any thread can use the blocking wrappers
+    while async callers fan out with gather. A semaphore caps calls in flight, and
+    request/token-per-minute buckets keep the whole process under the account's caps.
+    Each call is charged its estimated tokens up front and settled against the usage the
+    API reports. Rate limits, 5xx and connection errors are retried after the server's
+    Retry-After when given, else full-jitter exponential backoff, without holding a slot.
+    Per-label counters accumulate until get_metrics(reset=True), so each job can report its own.
+    max_in_flight: int # calls awaiting a response at once
+    tokens_per_minute: int # token budget; None disables it
+    requests_per_minute: int # request budget; None disables it
+    '''
+    def __init__(
+        self,
+        max_in_flight: int = LLM_MAX_IN_FLIGHT,
+        tokens_per_minute: int = LLM_TOKENS_PER_MINUTE,
+        requests_per_minute: int = LLM_REQUESTS_PER_MINUTE,
+        max_retries: int = LLM_MAX_RETRIES,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0
+    ):
+        self.max_in_flight = max_in_flight
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.metrics = {}  # label -> counters for calls finished since the last reset
+        self.lock = threading.Lock()
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="llm-gateway", daemon=True)
+        self.thread.start()
+        # Built on the loop so the client's connection pool and the semaphore belong to it
+        self.client, self.semaphore = self.run(self.setup())
+
+    async def setup(self):
+        # Retries are ours, so the SDK's own are off
+        return AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0), asyncio.Semaphore(self.max_in_flight)
+
+    def run(
+        self,
+        coroutine
+    ):
+        """Run a coroutine on the gateway's loop and block until it finishes."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    async def take(
+        self,
+        bucket: TokenBucket,
+        amount: float
+    ):
+        while True:
+            delay = bucket.wait_time(amount)
+            if not delay:
+                return
+            await asyncio.sleep(delay)
+
+    async def parse(
+        self,
+        label: str = None,
+        estimated_tokens: int = None,
+        **request
+    ):
+        """Await client.beta.chat.completions.parse(**request) under the process-wide limits."""
+        if estimated_tokens is None:
+            estimated_tokens = prompt_tokens(request.get("messages", [])) + EXPECTED_OUTPUT_TOKENS
+        label = label or "parse"
+
+        start_time = time.time()
+        attempt = 0
+        while True:
+            if self.request_bucket:
+                await self.take(self.request_bucket, 1)
+            if self.token_bucket:
+                await self.take(self.token_bucket, estimated_tokens)
+            attempt += 1
+            try:
+                # Only the request itself holds a slot; backoff sleeps below leave it to other calls
+                async with self.semaphore:
+                    response = await self.client.beta.chat.completions.parse(**request)
+            except Exception as e:
+                if attempt > self.max_retries or not is_retryable(e):
+                    self.record(label, start_time, attempt, False)
+                    raise
+                delay = retry_after(e)
+                if delay is None or delay > MAX_RETRY_AFTER:
+                    delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+                print(f"Retrying {label} in {delay:.1f}s after attempt {attempt} failed: {e}")
+                await asyncio.sleep(delay)
+                continue
+
+            usage = getattr(response, "usage", None)
+            if usage is not None and self.token_bucket:
+                self.token_bucket.debit(usage.total_tokens - estimated_tokens)
+            self.record(label, start_time, attempt, True, usage)
+            return response
+
+    def parse_sync(
+        self,
+        **kwargs
+    ):
+        """Blocking parse for the existing synchronous call sites; safe from any thread but the loop's."""
+        return self.run(self.parse(**kwargs))
+
+    def record(
+        self,
+        label: str,
+        start_time: float,
+        attempts: int,
+        ok: bool,
+        usage=None
+    ):
+        with self.lock:
+            entry = self.metrics.setdefault(label, {
+                "calls": 0, "failed": 0, "retries": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                "latencies": deque(maxlen=LATENCY_SAMPLES),
+            })
+            entry["calls"] += 1
+            entry["failed"] += not ok
+            entry["retries"] += attempts - 1
+            entry["prompt_tokens"] += getattr(usage, "prompt_tokens", 0)
+            entry["completion_tokens"] += getattr(usage, "completion_tokens", 0)
+            entry["latencies"].append(round(time.time() - start_time, 3))
+
+    def get_metrics(
+        self,
+        reset: bool = False
+    ) -> dict:
+        """Summarize calls per label since the last reset: count, failures, retries, tokens and latency."""
+        with self.lock:
+            metrics = self.metrics
+            if reset:
+                self.metrics = {}
+            else:
+                metrics = {label: dict(entry, latencies=list(entry["latencies"])) for label, entry in metrics.items()}
+        summary = {}
+        for label, entry in metrics.items():
+            entry = dict(entry)
+            latencies = sorted(entry.pop("latencies"))
+            entry["mean_latency"] = round(sum(latencies) / len(latencies), 3)
+            entry["p95_latency"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            summary[label] = entry
+        return summary
+
+    def close(self):
+        self.run(self.client.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+_llm_gateway = None
+_llm_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Return the process-wide gateway shared by every LLM call."""
+    global _llm_gateway
+    with _llm_gateway_lock:
+        if _llm_gateway is None:
+            _llm_gateway = LLMGateway()
+        return _llm_gateway
@@ -1,7 +1,8 @@
 from openai_functions import generate_items, expand_item
 from lib_types import *
 from crawler import Crawler
-from process_text import process_pdf, chunk_text_data, extract_content_from_html
+from process_text import process_pdf, extract_content_from_html
+from text_chunker import chunk_text_data
 from lib_types import MenuItemSmall, MenuItemLarge
 from generate_menu_handler import GenerateMenuHandler
 from openai_functions import *
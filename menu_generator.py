@@ -1,10 +1,12 @@
 import os
-import uuid
+import json
+import time
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import boto3
-import pytesseract
-from PIL import Image
-from PyPDF2 import PdfReader
 from basemodel_types import *
+from text_chunker import CHUNK_TOKENS
 
 # S3 configuration
 S3_BUCKET = "menu-tool-bucket"
@@ -41,7 +43,17 @@ TEMP_DIR = "/tmp/menu_tool"
 os.makedirs(TEMP_DIR, exist_ok=True)
 
 # Generation Variables
-CHUNK_SIZE = 500
+EXTRACTION_WORKERS = 4  # Pages cleaned concurrently while the crawl continues
+MAX_PENDING_PAGES = 8  # Pages held in memory awaiting extraction before spilling to disk
+FILE_WORKERS = 8  # Uploaded files downloaded and parsed at once
+IN_MEMORY_FILE_BYTES = 16 * 1024 * 1024  # Smaller uploads never touch the disk
+EXPANSION_WORKERS = int(os.getenv("EXPANSION_WORKERS", "8"))  # Items expanded at once
+EXPANSION_ATTEMPTS = 2  # Tries per item before it is left out
+STATUS_INTERVAL = 2.0  # Seconds between progress updates while expanding
+# Batched expansion: items per request are packed until their prompt plus expected output fills this budget
+EXPANSION_BATCH_TOKENS = int(os.getenv("EXPANSION_BATCH_TOKENS", "6000"))
+EXPANDED_ITEM_TOKENS = 350  # Typical output per FullItem; wine flashcards run longest
+EXPANSION_MAX_BATCH = 20
 
 
 class MenuGenerator:
@@ -51,20 +63,23 @@ class MenuGenerator:
     url: string # properly formatted url string
     file_keys: list[string] # list of s3 keys for each file
     request_id: string # unique id for this request; used to read/write from/to the s3 bucket
+    driver_pool: DriverPool # optional long-lived pool of warm drivers to crawl with
     '''
     def __init__(
         self, 
         url: str, 
         file_keys: list, 
-        request_id: str
+        request_id: str,
+        driver_pool=None
     ):
         self.url = url.strip() if url else None
         self.file_keys = file_keys
         self.request_id = request_id
+        self.driver_pool = driver_pool
 
     def generate(
         self, 
-        chunk_size: int = CHUNK_SIZE
+        chunk_tokens: int = CHUNK_TOKENS
     ):
         """
         Execute all steps to generate expanded menu items:
@@ -89,7 +104,7 @@ class MenuGenerator:
 
         # Step 3: Clean and chunk all relevant text
         update_status(self.request_id, "processing", "50%", "Cleaning and chunking text segments...")
-        chunks = self.clean_text_segments(raw_text_segments)
+        chunks = self.clean_text_segments(raw_text_segments, chunk_tokens)
 
         # Step 4: Generate PartialItems from the chunks
         update_status(self.request_id, "processing", "70%", "Generating menu item templates...")
@@ -109,83 +124,101 @@ class MenuGenerator:
 
     def download_file_from_s3(
         self, 
-        file_key: str
-    ) -> str:
-        local_path = os.path.join(TEMP_DIR, os.path.basename(file_key))
+        file_key: str,
+        directory: str,
+        index: int
+    ):
+        """
+        Fetch an uploaded file, returning its bytes when small and otherwise the path it was
+        streamed to inside this request's temp directory. None if the download failed.
+        """
         try:
-            s3_client.download_file(S3_BUCKET, file_key, local_path)
+            response = s3_client.get_object(Bucket=S3_BUCKET, Key=file_key)
+            body = response["Body"]
+            if response["ContentLength"] <= IN_MEMORY_FILE_BYTES:
+                return body.read()
+
+            # The index keeps two uploads with the same basename from colliding
+            local_path = os.path.join(directory, f"{index}-{os.path.basename(file_key)}")
+            with open(local_path, "wb") as f:
+                for chunk in body.iter_chunks(1024 * 1024):
+                    f.write(chunk)
             return local_path
         except Exception as e:
             print(f"Error downloading {file_key} from S3: {e}")
             return None
 
-    def create_pdf_from_image(
+    def extract_text_from_image(
         self, 
-        image_path: str
+        image,
+        name: str
     ) -> str:
         '''
-        1. Uses tesseract to convert image to a pdf
-        2. Returns the path to that pdf
+        1. OCR the image (a path or its bytes) in the process pool, straight to text with no intermediate PDF
+        2. Return the text, column by column with prices kept on their dish's line
         '''
-        try:
-            image = Image.open(image_path)
-            pdf_bytes = pytesseract.image_to_pdf_or_hocr(image, extension='pdf')
-            pdf_path = os.path.join(TEMP_DIR, f"{uuid.uuid4()}.pdf")
-            with open(pdf_path, 'wb') as f:
-                f.write(pdf_bytes)
-            return pdf_path
-        except Exception as e:
-            print(f"Error converting image {image_path} to PDF: {e}")
-            return None
+        from image_ingest import get_image_ingestor
+        return get_image_ingestor().text_from_file(image, name)
 
     def extract_text_from_pdf(
         self, 
-        pdf_path: str
+        pdf
     ) -> str:
         '''
-        1. Use PdfReader to extract all text from the pdf
-        2. Return the list of extracted text
+        1. Extract the text layer of every page of the pdf (a path or its bytes), in parallel for long documents
+        2. OCR only the scanned pages that have no usable text layer
+        3. Return the text in page order, reusing the cached text for a PDF seen before
         '''
+        from pdf_ingest import get_pdf_ingestor
+        if isinstance(pdf, bytes):
+            return get_pdf_ingestor().text_from_bytes(pdf)
+        return get_pdf_ingestor().text_from_file(pdf)
+
+    def ingest_file(
+        self,
+        file_key: str,
+        directory: str,
+        index: int
+    ) -> str:
+        """Download one uploaded file and extract its text according to its kind."""
+        from image_ingest import IMAGE_EXTENSIONS
+        ext = os.path.splitext(file_key)[1].lower()
+        # TODO: add compatibility for all text-based files
+        if ext != ".pdf" and ext not in IMAGE_EXTENSIONS:
+            print(f"Unsupported file type for {file_key}")
+            return ""
+
+        source = self.download_file_from_s3(file_key, directory, index)
+        if source is None:
+            return ""
         try:
-            reader = PdfReader(pdf_path)
-            full_text = ""
-            for page in reader.pages:
-                page_text = page.extract_text() or ""
-                full_text += page_text
-            return full_text
+            if ext == ".pdf":
+                return self.extract_text_from_pdf(source)
+            return self.extract_text_from_image(source, file_key)
         except Exception as e:
-            print(f"Error extracting text from PDF {pdf_path}: {e}")
+            print(f"Error extracting text from {file_key}: {e}")
             return ""
 
     def get_relevant_text_from_files(
         self
     ) -> list:
         '''
-        1. Iterate through the files and handle them according to their kind
-        2. Append all content to a list and return
+        1. Download and parse every file at once, each parse starting as soon as its download lands
+        2. Return the content in the order the files were given
+        The request's temp directory is removed once every file is done, even on failure.
         '''
-        raw_text_segments = []
-        for file_key in self.file_keys:
-            local_path = self.download_file_from_s3(file_key)
-            if not local_path:
-                continue
-
-            ext = os.path.splitext(local_path)[1].lower()
-            # TODO: add compatibility for all text-based files
-            if ext == ".pdf":
-                text = self.extract_text_from_pdf(local_path)
-                if text:
-                    raw_text_segments.append(text)
-            elif ext in [".jpg", ".jpeg", ".png", ".bmp", ".gif"]:
-                pdf_path = self.create_pdf_from_image(local_path)
-                if pdf_path:
-                    text = self.extract_text_from_pdf(pdf_path)
-                    if text:
-                        raw_text_segments.append(text)
-            else:
-                print(f"Unsupported file type for {local_path}")
-
-        return raw_text_segments
+        if not self.file_keys:
+            return []
+
+        with tempfile.TemporaryDirectory(prefix=f"{self.request_id}-", dir=TEMP_DIR) as directory, \
+                ThreadPoolExecutor(max_workers=FILE_WORKERS) as executor:
+            futures = [
+                executor.submit(self.ingest_file, file_key, directory, index)
+                for index, file_key in enumerate(self.file_keys)
+            ]
+            texts = [future.result() for future in futures]
+
+        return [text for text in texts if text]
 
     def get_relevant_text_from_url(
         self, 
@@ -199,26 +232,67 @@ class MenuGenerator:
         try:
             from crawler import Crawler
             from process_text import process_pdf, extract_content_from_html
-            crawler = Crawler(url)
-            relevant_links, pdf_links = crawler.crawl()
-            pdf_texts = [process_pdf(link) for link, _ in pdf_links if link]
-            pdf_texts = [s for s in pdf_texts if s]
-            webpage_text = []
-            for link, html in relevant_links:
-                if link and html:
-                    webpage_text.extend(extract_content_from_html(html))
+            from boilerplate import BoilerplateIndex
+            crawler = Crawler(url, driver_pool=self.driver_pool)
+            boilerplate = BoilerplateIndex()
+
+            # Clean pages as the crawler finishes them instead of after the whole crawl
+            page_slots = threading.BoundedSemaphore(MAX_PENDING_PAGES)
+            with ThreadPoolExecutor(max_workers=EXTRACTION_WORKERS) as executor:
+                page_futures = []
+                for link, html in crawler.iter_pages():
+                    if not (link and html):
+                        continue
+                    if page_slots.acquire(blocking=False):
+                        future = executor.submit(extract_content_from_html, html, boilerplate=boilerplate)
+                        future.add_done_callback(lambda _: page_slots.release())
+                    else:
+                        # Extraction is behind; park the html on disk rather than in memory
+                        future = executor.submit(self.extract_spilled_page, self.spill_page(html), boilerplate)
+                    page_futures.append(future)
+                    del html  # Don't hold the page while waiting on the next one
+
+                pdf_futures = [executor.submit(process_pdf, link) for link, _ in crawler.pdf_links if link]
+                webpage_text = [line for future in page_futures for line in future.result()]
+                pdf_texts = [s for s in (future.result() for future in pdf_futures) if s]
+            print(f"Cross-page boilerplate removed: {boilerplate.get_stats()}")
+
             return webpage_text + pdf_texts
         except Exception as e:
             print(f"Error processing URL {url}: {e}")
             return []
 
+    def spill_page(
+        self,
+        html: str
+    ) -> str:
+        """Write a page's html to a temp file and return its path."""
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", suffix=".html", dir=TEMP_DIR, delete=False) as f:
+            f.write(html)
+            return f.name
+
+    def extract_spilled_page(
+        self,
+        path: str,
+        boilerplate=None
+    ) -> list:
+        """Extract content from a spilled page, deleting the file afterwards."""
+        from process_text import extract_content_from_html
+        try:
+            with open(path, encoding="utf-8") as f:
+                return extract_content_from_html(f.read(), boilerplate=boilerplate)
+        finally:
+            os.remove(path)
+
     def clean_text_segments(
         self, 
         segments: list, 
-        chunk_size: int = CHUNK_SIZE
+        chunk_tokens: int = CHUNK_TOKENS
     ) -> list:
-        from process_text import chunk_text_data
-        return chunk_text_data(segments, chunk_size=chunk_size)
+        from text_chunker import chunk_text_data
+        chunks = list(chunk_text_data(segments, max_tokens=chunk_tokens))
+        print(f"Packed {len(segments)} text segments into {len(chunks)} chunks of up to {chunk_tokens} tokens")
+        return chunks
 
     def generate_menu_templates(
         self, 
@@ -249,8 +323,8 @@ class MenuGenerator:
     ) -> list:
         '''
         1. Remove duplicate and malformed PartialItems
-        2. Generate FullItems from the well-formed Partialitems
-        3. Return FullItems
+        2. Generate FullItems from the well-formed PartialItems in token-budgeted batches, EXPANSION_WORKERS at a time
+        3. Return FullItems in the original order, without the items that failed every attempt
         '''
         # Remove duplicates based on item name.
         seen = set()
@@ -262,8 +336,6 @@ class MenuGenerator:
                 unique_items.append(item)
                 seen.add(key)
 
-        expanded_items = []
-        from openai_functions import expand_item
         # TODO: allow the user to hardcode the categories!
         # Hardcoded allergens and dietary options.
         allergens = [
@@ -274,15 +346,106 @@ class MenuGenerator:
             "Vegetarian", "Vegan", "Gluten-Free", "Dairy-Free", "Nut-Free",
             "Soy-Free", "Keto", "Paleo", "Low-Carb", "Low-Sodium", "Halal", "Kosher"
         ]
-        for item in unique_items:
+
+        # Expand batches concurrently; results go back into their original slots, and items a
+        # batch response didn't return are resubmitted on their own
+        total = len(unique_items)
+        results = [None] * total
+        done, fallbacks, last_update = 0, 0, 0
+        with ThreadPoolExecutor(max_workers=EXPANSION_WORKERS) as executor:
+            pending = {}  # future -> item indexes it covers
+            batches = self.plan_expansion_batches(unique_items)
+            for indexes in batches:
+                if len(indexes) == 1:
+                    future = executor.submit(self.expand_menu_template, unique_items[indexes[0]], item_categories, allergens, dietary)
+                else:
+                    future = executor.submit(self.expand_menu_batch, [unique_items[i] for i in indexes], item_categories, allergens, dietary)
+                pending[future] = indexes
+
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    indexes = pending.pop(future)
+                    if len(indexes) == 1:
+                        results[indexes[0]] = future.result()
+                        done += 1
+                        continue
+                    for index, expanded in zip(indexes, future.result()):
+                        if expanded:
+                            results[index] = expanded
+                            done += 1
+                        else:
+                            fallbacks += 1
+                            retry = executor.submit(self.expand_menu_template, unique_items[index], item_categories, allergens, dietary)
+                            pending[retry] = [index]
+                if done == total or time.monotonic() - last_update >= STATUS_INTERVAL:
+                    last_update = time.monotonic()
+                    self.report_expansion_progress(done, total)
+
+        expanded_items = [item for item in results if item]
+        print(
+            f"Expanded {len(expanded_items)}/{total} menu items in {len(batches)} batches, "
+            f"{fallbacks} retried individually"
+        )
+        return expanded_items
+
+    def plan_expansion_batches(
+        self,
+        items: list
+    ) -> list:
+        """Group item indexes into batches whose prompt and expected output fit EXPANSION_BATCH_TOKENS."""
+        from rate_limit import estimate_tokens
+        batches, current, current_tokens = [], [], 0
+        for index, item in enumerate(items):
+            tokens = estimate_tokens(f"{item.name} {item.description} {item.image} {item.details}") + EXPANDED_ITEM_TOKENS
+            if current and (current_tokens + tokens > EXPANSION_BATCH_TOKENS or len(current) >= EXPANSION_MAX_BATCH):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(index)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def expand_menu_batch(
+        self,
+        items: list,
+        item_categories: list,
+        allergens: list,
+        dietary: list
+    ) -> list:
+        """Expand several PartialItems in one request; None for each item the response left out."""
+        from openai_functions import expand_items
+        return expand_items(items, item_categories, allergens, dietary)
+
+    def expand_menu_template(
+        self,
+        item,
+        item_categories: list,
+        allergens: list,
+        dietary: list
+    ):
+        """Expand one PartialItem, retrying it on its own; None if every attempt fails."""
+        from openai_functions import expand_item
+        for attempt in range(1, EXPANSION_ATTEMPTS + 1):
             try:
                 expanded = expand_item(item, item_categories, allergens, dietary)
                 if expanded:
-                    expanded_items.append(expanded)
+                    return expanded
             except Exception as e:
                 print(f"Error expanding menu item {item.name}: {e}")
-        return expanded_items
+            if attempt < EXPANSION_ATTEMPTS:
+                print(f"Retrying expansion of menu item {item.name}")
+        return None
 
+    def report_expansion_progress(
+        self,
+        done: int,
+        total: int
+    ):
+        """Report expansion as items done / total, spread over the 90-99% band of overall progress."""
+        progress = 90 + 9 * done // max(total, 1)
+        update_status(self.request_id, "processing", f"{progress}%", f"Expanding menu items ({done}/{total})...")
 
 
 if __name__ == "__main__":
@@ -1,18 +1,15 @@
 from typing import List, Dict, Any
 from basemodel_types import *
-from openai import OpenAI
-from dotenv import load_dotenv
-import os
+from llm_gateway import get_llm_gateway
 
-# Create the client and set the model
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Every call goes through the shared gateway's client and rate limits
 gpt_model = "gpt-4o-mini"
 
 def informed_deletion(
     uncleaned: List[str], 
     topic: str,
-    strictness: str
+    strictness: str,
+    raise_errors: bool = False
 ) -> List[str]:
     # Construct the prompt for GPT to decide which indices to keep
     original = uncleaned
@@ -28,16 +25,19 @@ def informed_deletion(
     prompt = prompt_template.format(strings=formatted_strings, topic=topic, strictness=strictness)
 
     try:
-        response = client.beta.chat.completions.parse(
+        response = get_llm_gateway().parse_sync(
+            label="informed_deletion",
             model=gpt_model,
             messages=[{"role": "user", "content": prompt}],
             response_format=ListOfInt,
         )
 
-        kept_indices = response.choices[0].message.parsed.keep_these
-        return [original[i] for i in kept_indices]
+        kept_indices = response.choices[0].message.parsed.elements
+        return [original[i] for i in kept_indices if 0 <= i < len(original)]
 
     except Exception as e:
+        if raise_errors:
+            raise
         print(f"Error processing prompt: {e}")
         return []
 
@@ -85,7 +85,8 @@ def generate_items(
 
     prompt = prompt_template.format(chunk=chunk)
     try:
-        response = client.beta.chat.completions.parse(
+        response = get_llm_gateway().parse_sync(
+            label="generate_items",
             model=gpt_model,
             messages=[{"role": "user", "content": prompt}],
             response_format=PartialItemList,
@@ -96,13 +97,11 @@ def generate_items(
         return []
 
 
-#TODO: HAVE A SEPARATE WINE/BEER/SPIRITS PROMPT
-def expand_item(
-    small_item: PartialItem, 
+def expansion_instructions(
     categories: List[str], 
     allergens: List[str], 
     dietary: List[str]
-) -> FullItem:
+) -> str:
     NAME_INSTR = "Leave as is."
     DESCRIPTION_INSTR = "Leave as is. In the case of a wine/beer/spirit, the description should be the same as the flashcard back."
     IMAGE_INSTR = "Leave as is."
@@ -113,13 +112,7 @@ def expand_item(
     ALLERGEN_INSTR = f"Choose allergens from this list that are in this menu item: {allergens}"
     DIETARY_INSTR = f"Choose dietary options that apply to this menu item: {dietary}"
 
-    prompt_template = (
-        "Expand the following small-format menu item into a detailed large-format menu item. "
-        "Include fields: menuType, itemType, foodCategoryId, flashcardBack, dietary, allergens, "
-        "relatedIds, storeIds, shiftIds, and tagIds. The small-format menu item data is:\n\n"
-        f"You will be provided information about a menu item."
-        f"Your task is to generate additional content for the menu item."
-        f"Here are the instructions for each data field:"
+    return (
         f"'name:' {NAME_INSTR}\n"
         f"'description:' {DESCRIPTION_INSTR}\n"
         f"'image:' {IMAGE_INSTR}\n"
@@ -129,6 +122,29 @@ def expand_item(
         f"'flashcardBack:' {FLASHCARDBACK_INSTR}\n"
         f"'allergenInfo:' {ALLERGEN_INSTR}\n"
         f"'dietaryInfo:' {DIETARY_INSTR}\n"
+    )
+
+
+def normalize_item_name(name: str) -> str:
+    """Case, whitespace and punctuation-insensitive key for matching items the model echoes back."""
+    return " ".join("".join(c if c.isalnum() else " " for c in name.lower()).split())
+
+
+#TODO: HAVE A SEPARATE WINE/BEER/SPIRITS PROMPT
+def expand_item(
+    small_item: PartialItem, 
+    categories: List[str], 
+    allergens: List[str], 
+    dietary: List[str]
+) -> FullItem:
+    prompt = (
+        "Expand the following small-format menu item into a detailed large-format menu item. "
+        "Include fields: menuType, itemType, foodCategoryId, flashcardBack, dietary, allergens, "
+        "relatedIds, storeIds, shiftIds, and tagIds. The small-format menu item data is:\n\n"
+        f"You will be provided information about a menu item."
+        f"Your task is to generate additional content for the menu item."
+        f"Here are the instructions for each data field:"
+        f"{expansion_instructions(categories, allergens, dietary)}"
         f"Name: {small_item.name}\n"
         f"Description: {small_item.description}\n"
         f"Image: {small_item.image}\n"
@@ -136,15 +152,9 @@ def expand_item(
         f"Leave the relatedIds, storeIds, shiftIds, tagIds fields blank."
         "Provide the expanded details in a structured format."
     )
-
-    prompt = prompt_template.format(
-        name=small_item.name,
-        description=small_item.description,
-        image=small_item.image.dict(),
-        details=", ".join(small_item.details) if small_item.details else "None",
-    )
     try:
-        response = client.beta.chat.completions.parse(
+        response = get_llm_gateway().parse_sync(
+            label="expand_item",
             model=gpt_model,
             messages=[{"role": "user", "content": prompt}],
             response_format=FullItem,
@@ -161,6 +171,54 @@ def expand_item(
         return None
 
 
+def expand_items(
+    small_items: List[PartialItem], 
+    categories: List[str], 
+    allergens: List[str], 
+    dietary: List[str]
+) -> List[FullItem]:
+    """
+    Expand several items in one request, sending the instructions and lists only once.
+    Returns one entry per input, matched by name; None where the response had no match.
+    """
+    items_text = "\n".join(
+        f"{i + 1}. Name: {item.name}\n"
+        f"   Description: {item.description}\n"
+        f"   Image: {item.image}\n"
+        f"   Details: {item.details}"
+        for i, item in enumerate(small_items)
+    )
+    prompt = (
+        "Expand each of the following small-format menu items into a detailed large-format menu item. "
+        "Include fields: menuType, itemType, foodCategoryId, flashcardBack, dietary, allergens, "
+        "relatedIds, storeIds, shiftIds, and tagIds.\n"
+        "Here are the instructions for each data field, applied to every item:\n"
+        f"{expansion_instructions(categories, allergens, dietary)}"
+        "Leave the relatedIds, storeIds, shiftIds, tagIds fields blank.\n"
+        f"Return exactly {len(small_items)} items, one per item below, in the same order, "
+        "keeping every name exactly as given.\n\n"
+        f"The small-format menu items are:\n{items_text}"
+    )
+    try:
+        response = get_llm_gateway().parse_sync(
+            label="expand_items",
+            model=gpt_model,
+            messages=[{"role": "user", "content": prompt}],
+            response_format=FullItemList,
+        )
+        parsed_response = response.choices[0].message.parsed
+        if not isinstance(parsed_response, FullItemList):
+            print("Response is invalid or not of type FullItemList.")
+            return [None] * len(small_items)
+    except Exception as e:
+        print(f"Error expanding items: {e}")
+        return [None] * len(small_items)
+
+    expanded_by_name = {}
+    for expanded in parsed_response.items:
+        expanded_by_name.setdefault(normalize_item_name(expanded.name), expanded)
+    return [expanded_by_name.pop(normalize_item_name(item.name), None) for item in small_items]
+
 
 def standardize_categories(
     category_list: List[str]
@@ -169,7 +227,8 @@ def standardize_categories(
     prompt = f"You will be given a list of categories found on a restaurant's menu. If any of the following are missing from the list, add them: {required_categories}. Remember that there are mutliple words for a term, so dont duplicate categories. Here is the current list: {category_list}"
     
     try:
-        response = client.beta.chat.completions.parse(
+        response = get_llm_gateway().parse_sync(
+            label="standardize_categories",
             model=gpt_model,
             messages=[{"role": "user", "content": prompt}],
             response_format=ListOfStrings,
@@ -0,0 +1,172 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from url_canon import canonicalize_url
+
+PAGE_CACHE_PATH = os.getenv("PAGE_CACHE_PATH", "/tmp/menu_tool/page_cache.sqlite3")
+PAGE_CACHE_TTL = 7 * 24 * 3600  # Seconds before an entry must be fetched again from scratch
+PAGE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+
+def content_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+class PageCache:
+    '''
+    On-disk SQLite cache of fetched pages keyed by canonical URL
+
+    Each entry stores the html handed to the extractor (static or rendered), the
+    ETag/Last-Modified validators and a hash of the raw HTTP body, so a revisit can
+    send a conditional request and reuse the cached render when nothing changed.
+    path: string # sqlite database file
+    ttl: float # seconds an entry stays valid
+    max_bytes: int # total html size kept before least-recently-used entries are evicted
+    '''
+    def __init__(
+        self,
+        path: str = PAGE_CACHE_PATH,
+        ttl: float = PAGE_CACHE_TTL,
+        max_bytes: int = PAGE_CACHE_MAX_BYTES
+    ):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    html TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_hash TEXT,
+                    size INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self.connection.execute("CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at)")
+
+    def key(
+        self,
+        url: str
+    ) -> str:
+        return canonicalize_url(url)
+
+    def get(
+        self,
+        url: str
+    ) -> dict:
+        """Return the cached entry for a url, or None if it is missing or past its TTL."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT html, etag, last_modified, content_hash, fetched_at FROM pages WHERE url = ?",
+                (self.key(url),),
+            ).fetchone()
+        if row is None:
+            return None
+
+        html, etag, last_modified, body_hash, fetched_at = row
+        if time.time() - fetched_at > self.ttl:
+            self.delete(url)
+            return None
+        return {
+            "html": html, "etag": etag, "last_modified": last_modified, "content_hash": body_hash,
+            "fetched_at": fetched_at,
+        }
+
+    def conditional_headers(
+        self,
+        entry: dict
+    ) -> dict:
+        """Build If-None-Match / If-Modified-Since headers from a cached entry."""
+        headers = {}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def is_unchanged(
+        self,
+        entry: dict,
+        response
+    ) -> bool:
+        """Decide whether a revalidation response means the cached page can be reused."""
+        if entry is None or response is None:
+            return False
+        if response.status_code == 304:
+            return True
+        return response.ok and entry["content_hash"] == content_hash(response.content)
+
+    def touch(
+        self,
+        url: str,
+        revalidated: bool = True
+    ):
+        """Mark an entry as used now, and as revalidated (restarting its TTL) unless told otherwise."""
+        now = time.time()
+        with self.lock, self.connection:
+            if revalidated:
+                self.connection.execute(
+                    "UPDATE pages SET accessed_at = ?, fetched_at = ? WHERE url = ?",
+                    (now, now, self.key(url)),
+                )
+            else:
+                self.connection.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (now, self.key(url)))
+
+    def store(
+        self,
+        url: str,
+        html: str,
+        response=None
+    ):
+        """Cache the html for a url along with the validators of the response that produced it."""
+        if not html:
+            return
+        etag = last_modified = body_hash = None
+        if response is not None and response.ok:
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            body_hash = content_hash(response.content)
+
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.key(url), html, etag, last_modified, body_hash, len(html), now, now),
+            )
+        self.evict()
+
+    def delete(
+        self,
+        url: str
+    ):
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM pages WHERE url = ?", (self.key(url),))
+
+    def evict(self):
+        """Drop expired entries, then least-recently-used ones until under max_bytes."""
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM pages WHERE fetched_at < ?", (time.time() - self.ttl,))
+            total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+
+            rows = self.connection.execute("SELECT url, size FROM pages ORDER BY accessed_at").fetchall()
+            evicted = []
+            for url, size in rows:
+                if total <= self.max_bytes:
+                    break
+                evicted.append((url,))
+                total -= size
+            self.connection.executemany("DELETE FROM pages WHERE url = ?", evicted)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
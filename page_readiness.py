@@ -0,0 +1,170 @@
+import json
+import time
+
+# Installs a MutationObserver on first call, scrolls to the bottom, and reports how long
+# the DOM has been quiet along with the current scroll height, all in a single round-trip.
+SAMPLE_SCRIPT = """
+if (!window.__menuToolReadiness) {
+    window.__menuToolReadiness = {lastMutation: performance.now()};
+    new MutationObserver(() => {
+        window.__menuToolReadiness.lastMutation = performance.now();
+    }).observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+}
+window.scrollTo(0, document.body ? document.body.scrollHeight : 0);
+return {
+    quietMs: performance.now() - window.__menuToolReadiness.lastMutation,
+    height: document.body ? document.body.scrollHeight : 0
+};
+"""
+
+# Brings every lazy-loaded element into view in one call instead of one RPC and sleep per element
+LAZY_LOAD_SCRIPT = """
+let elements = document.querySelectorAll('.lazy-load');
+for (let el of elements) {
+    el.scrollIntoView(true);
+}
+return elements.length;
+"""
+
+
+class PageReadiness:
+    '''
+    Decides when a rendered page has finished loading instead of sleeping for fixed intervals
+
+    A page is ready once all three signals agree:
+    - network idle: at most max_inflight requests outstanding, from Chrome DevTools performance logs
+    - DOM quiet: no mutations observed for quiet_period seconds
+    - layout stable: scroll height unchanged for stable_samples consecutive samples
+    budget: float # seconds a single page may wait before giving up
+    on_network_events: callable # optional observer handed every batch of Network events drained
+    '''
+    def __init__(
+        self,
+        budget: float = 10.0,
+        interval: float = 0.25,
+        quiet_period: float = 0.5,
+        stable_samples: int = 3,
+        max_inflight: int = 2,
+        on_network_events=None
+    ):
+        self.budget = budget
+        self.interval = interval
+        self.quiet_period = quiet_period
+        self.stable_samples = stable_samples
+        self.max_inflight = max_inflight
+        self.on_network_events = on_network_events
+
+    def drain_network_events(
+        self,
+        driver
+    ) -> list:
+        """Return the DevTools Network events logged since the last call, or None if logging is off."""
+        try:
+            entries = driver.get_log("performance")
+        except Exception:
+            return None
+
+        events = []
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            if message.get("method", "").startswith("Network."):
+                events.append(message)
+
+        # The performance log can only be read once, so share it with any other observer
+        if events and self.on_network_events:
+            self.on_network_events(events)
+        return events
+
+    def prepare(
+        self,
+        driver
+    ):
+        """Discard events left over from the driver's previous page; call before driver.get."""
+        self.drain_network_events(driver)
+
+    def wait(
+        self,
+        driver,
+        url: str,
+        budget: float = None
+    ) -> dict:
+        """Block until the page is ready or the budget runs out, and return wait metrics."""
+        budget = self.budget if budget is None else budget
+        start_time = time.time()
+        inflight = set()
+        peak_inflight = 0
+        network_tracked = True
+        idle_since = None
+        last_height = None
+        stable_count = 0
+        samples = 0
+        reason = "budget"
+
+        while True:
+            events = self.drain_network_events(driver)
+            if events is None:
+                network_tracked = False
+            else:
+                for event in events:
+                    request_id = event.get("params", {}).get("requestId")
+                    if event["method"] == "Network.requestWillBeSent":
+                        inflight.add(request_id)
+                    elif event["method"] in ("Network.loadingFinished", "Network.loadingFailed"):
+                        inflight.discard(request_id)
+                peak_inflight = max(peak_inflight, len(inflight))
+
+            now = time.time()
+            if not network_tracked or len(inflight) <= self.max_inflight:
+                idle_since = idle_since or now
+            else:
+                idle_since = None
+
+            try:
+                sample = driver.execute_script(SAMPLE_SCRIPT)
+            except Exception as e:
+                print(f"Error sampling page readiness for {url}: {e}")
+                reason = "error"
+                break
+            samples += 1
+
+            stable_count = stable_count + 1 if sample["height"] == last_height else 0
+            last_height = sample["height"]
+
+            network_idle = now - idle_since >= self.quiet_period
+            dom_quiet = sample["quietMs"] >= self.quiet_period * 1000
+            layout_stable = stable_count >= self.stable_samples
+            if network_idle and dom_quiet and layout_stable:
+                reason = "ready"
+                break
+
+            if now - start_time > budget:
+                break
+            time.sleep(self.interval)
+
+        return {
+            "url": url,
+            "waited": round(time.time() - start_time, 3),
+            "reason": reason,
+            "samples": samples,
+            "peak_inflight": peak_inflight,
+            "network_tracked": network_tracked,
+        }
+
+    def load_lazy_elements(
+        self,
+        driver,
+        url: str,
+        budget: float
+    ) -> dict:
+        """Scroll every .lazy-load element into view, then wait for whatever it triggered."""
+        try:
+            count = driver.execute_script(LAZY_LOAD_SCRIPT)
+        except Exception as e:
+            print(f"Error scrolling lazy elements on {url}: {e}")
+            return None
+        if not count:
+            return None
+        return self.wait(driver, url, budget=budget)
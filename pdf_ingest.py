@@ -0,0 +1,292 @@
+import io
+import os
+import time
+import mmap
+import hashlib
+import tempfile
+import threading
+from pypdf import PdfReader
+from http_client import get_session
+from process_pool import get_process_pool, PROCESS_WORKERS
+
+try:
+    import pytesseract
+    from pdf2image import convert_from_path
+except ImportError:  # Without them scanned pages stay empty and their text isn't cached
+    pytesseract = convert_from_path = None
+
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(50 * 1024 * 1024)))
+PDF_TEXT_CACHE_DIR = os.getenv("PDF_TEXT_CACHE_DIR", "/tmp/menu_tool/pdf_text")
+PARALLEL_MIN_PAGES = 8  # Smaller documents parse faster in-process than shipped to workers
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+# Scanned pages: anything with less text than this, or mostly symbols (broken font encodings), is OCR'd
+OCR_MIN_CHARS = 40
+OCR_MIN_ALNUM_RATIO = 0.5
+# 300 dpi is where tesseract's accuracy levels off; higher mostly costs time
+PDF_OCR_DPI = int(os.getenv("PDF_OCR_DPI", "300"))
+PDF_OCR_MAX_PAGES = int(os.getenv("PDF_OCR_MAX_PAGES", "50"))
+
+
+class PdfTooLarge(Exception):
+    pass
+
+
+def extract_page_range(
+    path: str,
+    start: int,
+    stop: int
+) -> list:
+    """Extract (text, seconds, "text") for pages [start, stop) of a PDF file; runs inside a pool worker."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        reader = PdfReader(buffer)
+        pages = []
+        for number in range(start, stop):
+            start_time = time.perf_counter()
+            text = page_text(reader, number)
+            pages.append((text, time.perf_counter() - start_time, "text"))
+        return pages
+
+
+def page_text(
+    reader: PdfReader,
+    number: int
+) -> str:
+    # One malformed page shouldn't cost the rest of the document
+    try:
+        return reader.pages[number].extract_text() or ""
+    except Exception as e:
+        print(f"Error extracting text from PDF page {number}: {e}")
+        return ""
+
+
+def needs_ocr(text: str) -> bool:
+    """Whether a page's text layer is missing or too thin to be the real content."""
+    stripped = "".join(text.split())
+    if len(stripped) < OCR_MIN_CHARS:
+        return True
+    return sum(c.isalnum() for c in stripped) / len(stripped) < OCR_MIN_ALNUM_RATIO
+
+
+def ocr_page(
+    path: str,
+    number: int,
+    dpi: int
+) -> (str, float):
+    """Rasterize one page in grayscale and OCR it; runs inside a pool worker."""
+    start_time = time.perf_counter()
+    images = convert_from_path(path, dpi=dpi, first_page=number + 1, last_page=number + 1, grayscale=True)
+    try:
+        text = "\n".join(pytesseract.image_to_string(image) for image in images)
+    except pytesseract.TesseractNotFoundError as e:
+        # Unpicklable; raised as-is from a worker it would break the process pool shared with photo OCR
+        raise RuntimeError(str(e)) from None
+    return text, time.perf_counter() - start_time
+
+
+class PdfIngestor:
+    '''
+    Downloads and extracts text from PDFs without shared temp paths, caching text by content hash
+
+    Downloads are streamed and abandoned past max_bytes. Each document is written once to a
+    private temp file that pool workers memory-map; long ones have their text layer extracted
+    in contiguous page ranges across the process pool shared with photo OCR. Pages whose text
+    layer is missing or too thin (scanned menus) are then rasterized and OCR'd individually in
+    the pool, so mixed documents come back complete without OCR-ing pages that already have text. Extracted text is
+    cached on disk under the sha256 of the PDF bytes, so the same menu linked from several
+    sites or uploaded again is only processed once.
+    max_bytes: int # largest PDF accepted
+    workers: int # page ranges a long document's text layer is split into
+    cache_dir: string # directory of cached extracted text
+    ocr_dpi: int # resolution scanned pages are rasterized at
+    '''
+    def __init__(
+        self,
+        max_bytes: int = PDF_MAX_BYTES,
+        workers: int = PROCESS_WORKERS,
+        cache_dir: str = PDF_TEXT_CACHE_DIR,
+        ocr_dpi: int = PDF_OCR_DPI,
+        timeout: float = 30
+    ):
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.cache_dir = cache_dir
+        self.ocr_dpi = ocr_dpi
+        self.timeout = timeout
+        self.stats = {"documents": 0, "pages": 0, "ocr_pages": 0, "text_seconds": 0.0, "ocr_seconds": 0.0}
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def download(
+        self,
+        url: str
+    ) -> bytes:
+        """Stream a PDF into memory, raising PdfTooLarge once it passes max_bytes."""
+        with get_session().get(url, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            declared = int(response.headers.get("Content-Length") or 0)
+            if declared > self.max_bytes:
+                raise PdfTooLarge(f"{url} is {declared} bytes")
+
+            buffer = io.BytesIO()
+            for chunk in response.iter_content(DOWNLOAD_CHUNK_BYTES):
+                buffer.write(chunk)
+                if buffer.tell() > self.max_bytes:
+                    raise PdfTooLarge(f"{url} passed {self.max_bytes} bytes")
+            return buffer.getvalue()
+
+    def cache_path(
+        self,
+        digest: str
+    ) -> str:
+        return os.path.join(self.cache_dir, f"{digest}.txt")
+
+    def cached_text(
+        self,
+        digest: str
+    ) -> str:
+        try:
+            with open(self.cache_path(digest), encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def store_text(
+        self,
+        digest: str,
+        text: str
+    ):
+        # Write then rename so a concurrent reader never sees a partial file
+        try:
+            with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=self.cache_dir, delete=False) as f:
+                f.write(text)
+            os.replace(f.name, self.cache_path(digest))
+        except OSError as e:
+            print(f"Error caching PDF text {digest}: {e}")
+
+    def extract_pages(
+        self,
+        data: bytes
+    ) -> (list, bool):
+        """
+        Return (text, seconds, method) for every page in order, and whether every page that
+        needed OCR got it. Long documents have their text layer split across the process pool.
+        """
+        page_count = len(PdfReader(io.BytesIO(data)).pages)
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as f:
+            f.write(data)
+            f.flush()
+            if page_count < PARALLEL_MIN_PAGES or self.workers < 2:
+                pages = extract_page_range(f.name, 0, page_count)
+            else:
+                step = -(-page_count // self.workers)
+                pool = get_process_pool()
+                futures = [
+                    pool.submit(extract_page_range, f.name, start, min(start + step, page_count))
+                    for start in range(0, page_count, step)
+                ]
+                pages = [page for future in futures for page in future.result()]
+            complete = self.ocr_thin_pages(f.name, pages)
+        return pages, complete
+
+    def ocr_thin_pages(
+        self,
+        path: str,
+        pages: list
+    ) -> bool:
+        """OCR pages without a usable text layer in place; returns False if any were left out."""
+        thin = [number for number, (text, _, _) in enumerate(pages) if needs_ocr(text)]
+        if not thin:
+            return True
+        if convert_from_path is None or pytesseract is None:
+            print(f"Skipping OCR of {len(thin)} scanned PDF pages: pdf2image/pytesseract not installed")
+            return False
+
+        pool = get_process_pool()
+        futures = {number: pool.submit(ocr_page, path, number, self.ocr_dpi) for number in thin[:PDF_OCR_MAX_PAGES]}
+        complete = len(thin) <= PDF_OCR_MAX_PAGES
+        for number, future in futures.items():
+            try:
+                text, seconds = future.result()
+            except Exception as e:
+                print(f"Error OCR-ing PDF page {number}: {e}")
+                complete = False
+                continue
+            # Keep whichever is longer; a page with a little real text and a scan keeps the scan's text
+            if len(text.strip()) > len(pages[number][0].strip()):
+                pages[number] = (text, pages[number][1] + seconds, "ocr")
+        return complete
+
+    def text_from_bytes(
+        self,
+        data: bytes
+    ) -> str:
+        """Extract a PDF's text, one page per block, reusing cached text for identical bytes."""
+        digest = hashlib.sha256(data).hexdigest()
+        text = self.cached_text(digest)
+        if text is not None:
+            return text
+
+        pages, complete = self.extract_pages(data)
+        text = "\n".join(text for text, _, _ in pages)
+        # Text missing scanned pages would be served from the cache forever, so only cache complete results
+        if complete:
+            self.store_text(digest, text)
+        self.record(digest, pages)
+        return text
+
+    def record(
+        self,
+        digest: str,
+        pages: list
+    ):
+        ocr_pages = [seconds for _, seconds, method in pages if method == "ocr"]
+        text_pages = [seconds for _, seconds, method in pages if method == "text"]
+        with self.lock:
+            self.stats["documents"] += 1
+            self.stats["pages"] += len(pages)
+            self.stats["ocr_pages"] += len(ocr_pages)
+            self.stats["text_seconds"] += sum(text_pages)
+            self.stats["ocr_seconds"] += sum(ocr_pages)
+        timings = ", ".join(f"{number}:{method}:{seconds:.2f}s" for number, (_, seconds, method) in enumerate(pages))
+        print(f"PDF {digest[:12]}: {len(pages)} pages, {len(ocr_pages)} OCR'd; per page {timings}")
+
+    def get_metrics(self) -> dict:
+        with self.lock:
+            return dict(self.stats)
+
+    def text_from_url(
+        self,
+        url: str
+    ) -> str:
+        try:
+            return self.text_from_bytes(self.download(url))
+        except Exception as e:
+            print(f"Error processing PDF {url}: {e}")
+            return ""
+
+    def text_from_file(
+        self,
+        path: str
+    ) -> str:
+        try:
+            if os.path.getsize(path) > self.max_bytes:
+                raise PdfTooLarge(f"{path} is {os.path.getsize(path)} bytes")
+            with open(path, "rb") as f:
+                return self.text_from_bytes(f.read())
+        except Exception as e:
+            print(f"Error extracting text from PDF {path}: {e}")
+            return ""
+
+
+_pdf_ingestor = None
+_pdf_ingestor_lock = threading.Lock()
+
+
+def get_pdf_ingestor() -> PdfIngestor:
+    """Return the process-wide ingestor shared by crawled PDF links and uploaded files."""
+    global _pdf_ingestor
+    with _pdf_ingestor_lock:
+        if _pdf_ingestor is None:
+            _pdf_ingestor = PdfIngestor()
+        return _pdf_ingestor
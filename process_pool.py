@@ -0,0 +1,35 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# One set of processes serves PDF text extraction, PDF page OCR and photo OCR, so the stages don't oversubscribe the cores
+PROCESS_WORKERS = int(os.getenv("PROCESS_WORKERS", os.getenv("PDF_WORKERS", str(os.cpu_count() or 2))))
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Return the process-wide pool for CPU-bound parsing and OCR, replacing it if a worker died."""
+    global _process_pool
+    with _process_pool_lock:
+        # A worker killed mid-task (e.g. out of memory on a huge photo) breaks the pool for every later submit
+        if _process_pool is not None and getattr(_process_pool, "_broken", False):
+            print("Process pool broken; starting a new one")
+            _process_pool.shutdown(wait=False)
+            _process_pool = None
+        if _process_pool is None:
+            # Spawned rather than forked: the parent runs driver and HTTP threads that a fork would copy mid-flight
+            _process_pool = ProcessPoolExecutor(
+                max_workers=PROCESS_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _process_pool
+
+
+def close_process_pool():
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown()
+            _process_pool = None
@@ -1,80 +1,94 @@
-from pypdf import PdfReader
 import re
-import time
-import requests
-from typing import List, Dict, Any
-from bs4 import BeautifulSoup
-from concurrent.futures import ThreadPoolExecutor
-from collections import deque
+import lxml.html
+import lxml.etree
+from typing import List
+from collections import deque, Counter
 from openai_functions import informed_deletion
+from line_classifier import LineClassifier
+from rate_limit import get_llm_executor
+from line_prefilter import LinePrefilter, log_decisions
+from pdf_ingest import get_pdf_ingestor
 
 
 # Compile regex patterns for clean_text function
 WHITESPACE_PATTERN = re.compile(r"\s+")
 BASE64_PATTERN = re.compile(r"data:image/[a-zA-Z]+;base64,")
 NON_ALPHA_PATTERN = re.compile(r"[a-zA-Z0-9\s]")
+# lxml refuses str input carrying an encoding declaration, which older XHTML pages start with
+XML_DECLARATION_PATTERN = re.compile(r"^\s*<\?xml[^>]*\?>")
+# A block holding nothing but a price, e.g. <span class="price">$12</span> after the dish's name
+PRICE_ONLY_PATTERN = re.compile(r"^[$€£]?\s?\d{1,4}(?:[.,]\d{1,2})?\s?[$€£]?$")
 
+# Shared rule-based pre-filter applied before any LLM filtering
+LINE_CLASSIFIER = LineClassifier()
 
-def process_pdf(pdf_url):
-    try:
-        response = requests.get(pdf_url, timeout=30)
-        response.raise_for_status()
-        temp_pdf_path = "/tmp/temp.pdf"  # Ensure we use the writable /tmp directory
-        
-        with open(temp_pdf_path, "wb") as temp_pdf:
-            temp_pdf.write(response.content)
-        
-        reader = PdfReader(temp_pdf_path)
-        return "".join(page.extract_text() for page in reader.pages)
-    
-    except Exception as e:
-        return ""
+# Learned keep/drop model trained on past informed_deletion decisions; abstains until trained
+LINE_PREFILTER = LinePrefilter.load()
 
+# LLM filtering settings
+FILTER_TOPIC = "human-readable content related to a restaurants menu items"
 
-def filter_lines(lines: List[str], batch_size=50) -> List[str]:
-    # Define in context since the lines object will be loaded nearby in memory
-    def is_non_content(line: str) -> bool:
-        snippet = line[:100].strip()  # Take the first 100 characters and strip whitespace
-
-        # Rule 1: Check for excessive non-alphanumeric characters
-        if len(re.sub(r"[a-zA-Z0-9\s]", "", snippet)) / max(len(snippet), 1) > 0.4:
-            return True
+# Tags whose contents are never human-readable menu text
+SKIPPED_TAGS = {"script", "style", "meta", "link", "svg", "noscript", "template", "iframe"}
+# Tags that start a new line of text; everything else is treated as inline
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "body", "br", "caption", "dd", "details", "dialog",
+    "div", "dl", "dt", "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4",
+    "h5", "h6", "header", "hr", "html", "li", "main", "nav", "ol", "option", "p", "pre", "section",
+    "summary", "table", "tbody", "tfoot", "thead", "title", "tr", "ul",
+}
+# Table cells stay on their row's line (keeping a dish next to its price) but need a separator
+CELL_TAGS = {"td", "th"}
 
-        # Rule 2: Check for typical code patterns (e.g., HTML tags, base64, or random characters)
-        if re.search(r"<[a-zA-Z]+.*?>", snippet):  # Detect HTML-like tags
-            return True
-        if re.match(r"data:image/[a-zA-Z]+;base64,", snippet):  # Detect base64 image data
-            return True
 
-        # Rule 3: Check for random-like text with no spaces
-        if len(snippet) > 50 and " " not in snippet:
-            return True
-
-        # Rule 5: Detect JavaScript-like function definitions or object literals
-        if re.match(r"^!function|^window\.\w+|^{\"|^\[", snippet):  # JS functions, window objects, JSON
-            return True
-
-        # Rule 6: Detect lines with excessive curly braces or square brackets
-        if len(re.findall(r"[{}[\]]", snippet)) / max(len(snippet), 1) > 0.2:
-            return True
+def process_pdf(pdf_url):
+    return get_pdf_ingestor().text_from_url(pdf_url)
 
-        # Rule 7: Detect key-value patterns typical of JSON or configuration
-        if re.search(r"\"[^\"]+\"\s*:\s*[^\s]+", snippet):
-            return True
 
-        return False
+def filter_lines(lines: List[str], batch_size=50) -> List[str]:
+    filtered_kinda, rule_hits = LINE_CLASSIFIER.classify(lines)
+    print(f"Dropped {sum(rule_hits.values())}/{len(lines)} non-content lines: {dict(rule_hits)}")
+
+    # Answer obvious lines locally; only the uncertain ones are worth an LLM call
+    decisions = LINE_PREFILTER.decide(filtered_kinda)
+    uncertain = [line for line, decision in zip(filtered_kinda, decisions) if decision is None]
+
+    # Send every batch at once; the LLM gateway applies the rate limits and results keep line order
+    executor = get_llm_executor()
+    batches, futures = [], []
+    for i in range(0, len(uncertain), batch_size):
+        batch = uncertain[i:i+batch_size]
+        batches.append(batch)
+        futures.append(executor.submit(informed_deletion, batch, FILTER_TOPIC, "certain", raise_errors=True))
+
+    kept_by_llm = Counter()
+    for batch, future in zip(batches, futures):
+        try:
+            kept = future.result()
+        except Exception as e:
+            print(f"Error filtering batch: {e}")
+            continue
+        kept_by_llm.update(kept)
+        log_decisions(batch, kept)
 
-    filtered_kinda = [line for line in lines if not is_non_content(line)]
     fully_filtered = []
-
-    for i in range(0, len(filtered_kinda), batch_size):
-        fully_filtered.extend(informed_deletion(filtered_kinda[i:i+batch_size], "human-readable content related to a restaurants menu items", "certain"))
+    for line, decision in zip(filtered_kinda, decisions):
+        if decision is None and kept_by_llm[line] > 0:
+            kept_by_llm[line] -= 1
+            fully_filtered.append(line)
+        elif decision:
+            fully_filtered.append(line)
+    print(f"Line prefilter: {LINE_PREFILTER.get_metrics()}")
 
     fully_filtered = [s.replace('\n', ' ') for s in fully_filtered]
     return fully_filtered
 
 
-def extract_content_from_html(html: str, repetition_threshold=5) -> List[str]:
+def extract_lines_from_html(html: str, repetition_threshold=5) -> List[str]:
+    """
+    Walk the DOM once, emitting the text of each block-level element and each image src exactly once.
+    Text inside inline elements (spans, links, bold, ...) is merged into its enclosing block.
+    """
     def clean_text(text: str) -> str:
         # Normalize whitespace
         cleaned_text = WHITESPACE_PATTERN.sub(" ", text).strip()
@@ -93,59 +107,80 @@ def extract_content_from_html(html: str, repetition_threshold=5) -> List[str]:
 
         return cleaned_text
 
-    bs_parser = BeautifulSoup(html, "html.parser")
-
-    # TODO: IS THE TEXT DATA BEING FILTERED OUT OR IS IT NEVER SCRAPED?
-    with open("testing_output/html_content.txt", "a+", encoding="utf-8") as file:
-        file.write(f"{html}\n----NEXT----\n")
-
-    # Remove tags that contain code and irrelevant stuff
-    for tag in bs_parser.find_all(["script", "style", "meta", "link", "svg", "noscript"], recursive=True):
-        tag.decompose()
+    try:
+        # The text is already decoded, so the declared encoding no longer applies
+        root = lxml.html.fromstring(XML_DECLARATION_PATTERN.sub("", html, count=1))
+    except (lxml.etree.ParserError, ValueError) as e:
+        print(f"Error parsing html ({len(html)} chars): {e}")
+        return []
 
-    # Extract anything that may contain image or text content
     raw_lines = []
     recent_lines = deque(maxlen=repetition_threshold)
-    for tag in bs_parser.find_all(True):
-        if tag.name == "img" and tag.has_attr("src"):
-            line = f"IMAGE[{clean_text(tag['src'])}]"
-        else:
-            text = tag.text.strip()
-            if not text:
-                continue
-            line = clean_text(text)
+    buffer = []
 
+    def emit(line: str):
         if line and line not in recent_lines:
             raw_lines.append(line)
             recent_lines.append(line)
 
+    def flush():
+        text = "".join(buffer).strip()
+        buffer.clear()
+        if not text:
+            return
+        # A lone price is mostly symbols and would be dropped on its own; keep it with the dish above
+        if PRICE_ONLY_PATTERN.match(text):
+            if raw_lines and not raw_lines[-1].startswith("IMAGE["):
+                raw_lines[-1] = f"{raw_lines[-1]} {text}"
+                recent_lines.append(raw_lines[-1])
+            else:
+                emit(text)
+            return
+        emit(clean_text(text))
+
+    # Iterative pre/post-order walk so deeply nested pages can't hit the recursion limit
+    stack = [(root, False)]
+    while stack:
+        node, closing = stack.pop()
+        if closing:
+            if node.tag in BLOCK_TAGS:
+                flush()
+            if node.tail:
+                buffer.append(node.tail)
+            continue
+
+        # Comments and processing instructions have non-string tags
+        if not isinstance(node.tag, str) or node.tag in SKIPPED_TAGS:
+            if node.tail:
+                buffer.append(node.tail)
+            continue
+
+        if node.tag in BLOCK_TAGS:
+            flush()
+        elif node.tag in CELL_TAGS:
+            buffer.append(" ")
+        if node.tag == "img" and node.get("src"):
+            flush()
+            emit(f"IMAGE[{clean_text(node.get('src'))}]")
+        if node.text:
+            buffer.append(node.text)
+
+        stack.append((node, True))
+        stack.extend((child, False) for child in reversed(node))
+    flush()
+
+    return raw_lines
+
+
+def extract_content_from_html(html: str, repetition_threshold=5, boilerplate=None) -> List[str]:
+    # Extract anything that may contain image or text content
+    raw_lines = extract_lines_from_html(html, repetition_threshold)
+
+    # Strip lines repeated across the site's pages before paying to filter them
+    if boilerplate is not None:
+        raw_lines = boilerplate.strip(raw_lines)
+
     # Filter the content
     filtered_lines = filter_lines(raw_lines)
 
     return filtered_lines
-
-
-def chunk_text_data(text_list, chunk_size, buffer_size=100):
-    if not text_list:
-        return []
-
-    full_text = " ".join(text_list)
-
-    sentences = re.split(r'(?<=[.!?]) +', full_text)
-    chunks, current_chunk = [], []
-
-    for sentence in sentences:
-        if len(" ".join(current_chunk) + sentence) > chunk_size:
-            chunk = " ".join(current_chunk).strip()
-            chunks.append(chunk)
-
-            buffer_start = max(0, len(chunk) - buffer_size)
-            buffer_text = chunk[buffer_start:]
-
-            current_chunk = [buffer_text]
-        current_chunk.append(sentence)
-
-    if current_chunk:
-        chunks.append(" ".join(current_chunk).strip())
-
-    return chunks
@@ -0,0 +1,79 @@
+import os
+import time
+import threading
+import openai
+from concurrent.futures import ThreadPoolExecutor
+
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "200000"))
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting; about four characters per token for English."""
+    return len(text) // 4 + 1
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits, server errors and dropped connections are worth retrying; bad requests aren't."""
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(error, openai.APIConnectionError)
+
+
+class TokenBucket:
+    '''
+    Thread-safe token bucket refilled continuously at rate_per_minute
+
+    capacity: float # largest burst allowed; defaults to one minute's worth
+    '''
+    def __init__(
+        self,
+        rate_per_minute: float,
+        capacity: float = None
+    ):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait_time(
+        self,
+        amount: float
+    ) -> float:
+        """Take `amount` tokens if available and return 0, otherwise return seconds until they will be."""
+        amount = min(amount, self.capacity)  # Oversized requests wait for a full bucket rather than forever
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return 0
+            return (amount - self.tokens) / self.rate
+
+    def debit(
+        self,
+        amount: float
+    ):
+        """Settle a call that used `amount` more tokens than it was charged (fewer if negative); may go into debt."""
+        with self.lock:
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+_llm_executor = None
+_llm_executor_lock = threading.Lock()
+
+
+def get_llm_executor() -> ThreadPoolExecutor:
+    """
+    Return the process-wide thread pool LLM-bound stages fan their blocking calls out on.
+    Rate limits and retries live in the LLM gateway every call goes through; this only
+    bounds how many threads wait on it at once.
+    """
+    global _llm_executor
+    with _llm_executor_lock:
+        if _llm_executor is None:
+            _llm_executor = ThreadPoolExecutor(max_workers=LLM_MAX_IN_FLIGHT, thread_name_prefix="llm")
+        return _llm_executor
@@ -0,0 +1,121 @@
+import threading
+from collections import Counter
+
+# URL patterns per resource type; the crawler only reads DOM text and img src attributes,
+# so none of these need to be downloaded for extraction to work
+RESOURCE_TYPE_PATTERNS = {
+    "image": ["png", "jpg", "jpeg", "gif", "webp", "avif", "bmp", "ico", "svg"],
+    "font": ["woff", "woff2", "ttf", "otf", "eot"],
+    "media": ["mp4", "webm", "mov", "m4v", "m3u8", "mp3", "ogg", "wav", "m4a"],
+    "stylesheet": ["css"],
+}
+DEFAULT_BLOCKED_TYPES = ("image", "font", "media")
+
+# Analytics, ad and session-recording hosts commonly embedded in restaurant sites
+TRACKER_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googleadservices.com",
+    "googlesyndication.com",
+    "doubleclick.net",
+    "facebook.net",
+    "connect.facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+    "segment.io",
+    "cdn.segment.com",
+    "mixpanel.com",
+    "fullstory.com",
+    "nr-data.net",
+    "analytics.tiktok.com",
+    "static.ads-twitter.com",
+    "bat.bing.com",
+)
+
+
+class ResourceFilter:
+    '''
+    Blocks resource types and third-party domains in Chrome through DevTools Network.setBlockedURLs
+
+    block_types: tuple # keys of RESOURCE_TYPE_PATTERNS to block
+    allow_types: tuple # types to load even if listed in block_types
+    block_domains: tuple # third-party hosts whose requests are dropped
+    allow_domains: tuple # hosts to load even if listed in block_domains
+    '''
+    def __init__(
+        self,
+        block_types: tuple = DEFAULT_BLOCKED_TYPES,
+        allow_types: tuple = (),
+        block_domains: tuple = TRACKER_DOMAINS,
+        allow_domains: tuple = ()
+    ):
+        self.block_types = [t for t in block_types if t not in allow_types]
+        self.block_domains = [d for d in block_domains if d not in allow_domains]
+        self.blocked_requests = Counter()  # DevTools resource type -> blocked request count
+        self.loaded_bytes = 0  # Bytes transferred for requests that were allowed through
+        self.lock = threading.Lock()
+
+    def blocked_url_patterns(self) -> list:
+        """Build the wildcard URL patterns passed to Network.setBlockedURLs."""
+        patterns = []
+        for resource_type in self.block_types:
+            for extension in RESOURCE_TYPE_PATTERNS.get(resource_type, []):
+                patterns.append(f"*.{extension}")
+                patterns.append(f"*.{extension}?*")
+        for domain in self.block_domains:
+            patterns.append(f"*://{domain}/*")
+            patterns.append(f"*://*.{domain}/*")
+        return patterns
+
+    def configure_options(
+        self,
+        chrome_options
+    ):
+        """Stop the renderer itself from decoding images or autoplaying media."""
+        prefs = {}
+        if "image" in self.block_types:
+            prefs["profile.managed_default_content_settings.images"] = 2
+        if prefs:
+            chrome_options.add_experimental_option("prefs", prefs)
+        if "media" in self.block_types:
+            chrome_options.add_argument("--autoplay-policy=user-gesture-required")
+
+    def apply(
+        self,
+        driver
+    ):
+        """Install the blocklist on a driver; it stays active across navigations."""
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.blocked_url_patterns()})
+        except Exception as e:
+            print(f"Error installing resource filter: {e}")
+
+    def record_events(
+        self,
+        events: list
+    ):
+        """Tally blocked requests and loaded bytes from DevTools Network events."""
+        with self.lock:
+            for event in events:
+                params = event.get("params", {})
+                if event["method"] == "Network.loadingFailed" and params.get("blockedReason"):
+                    self.blocked_requests[params.get("type", "Other")] += 1
+                elif event["method"] == "Network.loadingFinished":
+                    self.loaded_bytes += int(params.get("encodedDataLength", 0))
+
+    def get_stats(
+        self,
+        reset: bool = False
+    ) -> dict:
+        """Return a snapshot of the filter's counters, optionally zeroing them so the next job counts from scratch."""
+        with self.lock:
+            stats = {
+                "blocked_requests": dict(self.blocked_requests),
+                "blocked_total": sum(self.blocked_requests.values()),
+                "loaded_bytes": self.loaded_bytes,
+            }
+            if reset:
+                self.blocked_requests = Counter()
+                self.loaded_bytes = 0
+            return stats
@@ -0,0 +1,131 @@
+import gzip
+import requests
+from datetime import datetime, timezone
+import xml.etree.ElementTree as ET
+from urllib.parse import urljoin, urlparse
+from http_client import get_session
+
+MAX_SITEMAP_BYTES = 10 * 1024 * 1024
+DEFAULT_SITEMAP_PATHS = ["/sitemap.xml", "/sitemap_index.xml"]
+
+
+def local_name(tag: str) -> str:
+    """Strip the XML namespace from an element tag."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_lastmod(value: str) -> float:
+    """Return the latest timestamp a sitemap <lastmod> allows for, or None if it can't be read."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        if len(value) == 10:
+            # A bare date covers the whole day, so a page fetched that morning may already be stale
+            return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp() + 24 * 3600
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class SiteDiscovery:
+    '''
+    Finds a site's pages from robots.txt and sitemap.xml over plain HTTP, before any rendering
+
+    start_url: string # any page on the site
+    max_sitemaps: int # cap on sitemap files fetched, including those listed by sitemap indexes
+    max_urls: int # cap on page urls returned
+    '''
+    def __init__(
+        self,
+        start_url: str,
+        timeout: float = 10,
+        max_sitemaps: int = 20,
+        max_urls: int = 5000
+    ):
+        parsed = urlparse(start_url)
+        self.base_url = f"{parsed.scheme or 'https'}://{parsed.netloc}"
+        self.timeout = timeout
+        self.max_sitemaps = max_sitemaps
+        self.max_urls = max_urls
+
+    def fetch(
+        self,
+        url: str
+    ) -> bytes:
+        """GET a url and return its body, or None on failure or if it is too large."""
+        try:
+            with get_session().get(url, timeout=self.timeout, stream=True) as response:
+                if not response.ok:
+                    return None
+                body = response.raw.read(MAX_SITEMAP_BYTES + 1, decode_content=True)
+            if len(body) > MAX_SITEMAP_BYTES:
+                print(f"Skipping oversized sitemap: {url}")
+                return None
+            return body
+        except requests.RequestException as e:
+            print(f"Error fetching {url}: {e}")
+            return None
+
+    def robots_sitemaps(self) -> list:
+        """Return the sitemap urls declared in robots.txt."""
+        body = self.fetch(urljoin(self.base_url, "/robots.txt"))
+        if not body:
+            return []
+
+        sitemaps = []
+        for line in body.decode("utf-8", errors="ignore").splitlines():
+            key, _, value = line.partition(":")
+            if key.strip().lower() == "sitemap" and value.strip():
+                sitemaps.append(urljoin(self.base_url, value.strip()))
+        return sitemaps
+
+    def parse_sitemap(
+        self,
+        body: bytes
+    ) -> (list, list):
+        """Parse a sitemap or sitemap index into (child sitemap urls, [(page url, lastmod)])."""
+        try:
+            if body[:2] == b"\x1f\x8b":
+                body = gzip.decompress(body)
+            root = ET.fromstring(body)
+        except (ET.ParseError, OSError, EOFError) as e:
+            print(f"Error parsing sitemap: {e}")
+            return [], []
+
+        child_sitemaps, pages = [], []
+        for entry in root:
+            fields = {local_name(child.tag): (child.text or "").strip() for child in entry}
+            if not fields.get("loc"):
+                continue
+            if local_name(root.tag) == "sitemapindex":
+                child_sitemaps.append(fields["loc"])
+            else:
+                pages.append((fields["loc"], fields.get("lastmod")))
+        return child_sitemaps, pages
+
+    def discover(self) -> list:
+        """Walk robots.txt and the sitemaps it leads to, returning (url, lastmod) pairs."""
+        pending = self.robots_sitemaps() or [urljoin(self.base_url, path) for path in DEFAULT_SITEMAP_PATHS]
+        fetched = set()
+        pages = {}
+
+        while pending and len(fetched) < self.max_sitemaps and len(pages) < self.max_urls:
+            sitemap_url = pending.pop(0)
+            if sitemap_url in fetched:
+                continue
+            fetched.add(sitemap_url)
+
+            body = self.fetch(sitemap_url)
+            if not body:
+                continue
+            child_sitemaps, sitemap_pages = self.parse_sitemap(body)
+            pending.extend(child_sitemaps)
+            for url, lastmod in sitemap_pages:
+                pages.setdefault(url, lastmod)
+
+        print(f"Discovered {len(pages)} urls from {len(fetched)} sitemaps")
+        return list(pages.items())[:self.max_urls]
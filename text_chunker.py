@@ -0,0 +1,148 @@
+import os
+import re
+from typing import Iterable, Iterator, List
+from rate_limit import estimate_tokens
+
+try:
+    import tiktoken
+except ImportError:  # Fall back to the character estimate used for rate limiting
+    tiktoken = None
+
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "1200"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "100"))
+CHUNK_ENCODING_MODEL = "gpt-4o-mini"
+# When a chunk fills up, look back at most this share of it for a cleaner place to break
+BREAK_LOOKBACK = 0.25
+
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+# A line ending in a price usually closes a menu item, so the next line is a safe place to break
+PRICE_END_PATTERN = re.compile(r"(?:[$€£]\s?\d+(?:[.,]\d{1,2})?|\d+[.,]\d{2})\s*$")
+
+
+def get_token_counter():
+    """Return a function counting model tokens in a string, using tiktoken when it is installed."""
+    if tiktoken is None:
+        return estimate_tokens
+    try:
+        encoding = tiktoken.encoding_for_model(CHUNK_ENCODING_MODEL)
+    except KeyError:
+        encoding = tiktoken.get_encoding("o200k_base")
+    return lambda text: len(encoding.encode_ordinary(text))
+
+
+def is_break_after(unit: str) -> bool:
+    """Whether a chunk can end after this unit without cutting a menu item in half."""
+    return bool(PRICE_END_PATTERN.search(unit)) or unit.endswith((".", "!", "?"))
+
+
+class TextChunker:
+    '''
+    Packs text into chunks of at most max_tokens model tokens, counting each unit exactly once
+
+    Lines are the atomic unit since scraped menus put one item field per line; only lines
+    longer than a whole chunk are split at sentence boundaries (and, failing that, on words).
+    A full chunk is cut after the most recent line that closes a menu item (one ending in a
+    price or a full stop) when one exists in the last part of the chunk, and the next chunk
+    starts with whole lines from the end of the previous one, up to overlap_tokens.
+    max_tokens: int # token budget per chunk
+    overlap_tokens: int # tokens of trailing context repeated at the start of the next chunk
+    '''
+    def __init__(
+        self,
+        max_tokens: int = CHUNK_TOKENS,
+        overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+        count_tokens=None
+    ):
+        self.max_tokens = max_tokens
+        self.overlap_tokens = min(overlap_tokens, max_tokens // 2)
+        self.count_tokens = count_tokens or get_token_counter()
+
+    def units(
+        self,
+        segment: str
+    ) -> Iterator[tuple]:
+        """Yield (text, tokens) for each line of a segment, splitting only oversized lines."""
+        for line in segment.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            tokens = self.count_tokens(line)
+            if tokens <= self.max_tokens:
+                yield line, tokens
+                continue
+            for sentence in SENTENCE_PATTERN.split(line):
+                sentence_tokens = self.count_tokens(sentence)
+                if sentence_tokens <= self.max_tokens:
+                    yield sentence, sentence_tokens
+                    continue
+                # A single run-on sentence bigger than a chunk: fall back to word windows
+                words = sentence.split()
+                step = max(1, len(words) * self.max_tokens // (2 * sentence_tokens))
+                for i in range(0, len(words), step):
+                    piece = " ".join(words[i:i + step])
+                    yield piece, self.count_tokens(piece)
+
+    def chunks(
+        self,
+        segments: Iterable[str]
+    ) -> Iterator[str]:
+        """Yield chunks as segments arrive; segments may be single lines or whole documents."""
+        current = []  # (text, tokens) pairs
+        total = 0
+        for segment in segments:
+            for unit in self.units(segment):
+                # Each unit is joined with a newline, which costs about one token
+                needed = unit[1] + 1
+                if current and total + needed > self.max_tokens:
+                    cut = self.break_point(current)
+                    yield "\n".join(text for text, _ in current[:cut])
+                    carried = current[cut:]
+                    current = self.overlap(current[:cut]) + carried
+                    total = sum(tokens + 1 for _, tokens in current)
+                    # Give up overlap before letting it crowd out the new unit
+                    while len(current) > len(carried) and total + needed > self.max_tokens:
+                        total -= current.pop(0)[1] + 1
+                    if current and total + needed > self.max_tokens:
+                        yield "\n".join(text for text, _ in current)
+                        current, total = [], 0
+                current.append(unit)
+                total += needed
+        if current:
+            yield "\n".join(text for text, _ in current)
+
+    def break_point(
+        self,
+        current: List[tuple]
+    ) -> int:
+        """Index to cut a full chunk at: after the last item-closing line near the end, else at the end."""
+        lookback = self.max_tokens * BREAK_LOOKBACK
+        tail_tokens = 0
+        for i in range(len(current), 0, -1):
+            if is_break_after(current[i - 1][0]):
+                return i
+            tail_tokens += current[i - 1][1] + 1
+            if tail_tokens > lookback:
+                break
+        return len(current)
+
+    def overlap(
+        self,
+        emitted: List[tuple]
+    ) -> List[tuple]:
+        """Whole trailing lines of the emitted chunk fitting in overlap_tokens."""
+        kept, tokens = [], 0
+        for text, unit_tokens in reversed(emitted):
+            if tokens + unit_tokens + 1 > self.overlap_tokens:
+                break
+            kept.append((text, unit_tokens))
+            tokens += unit_tokens + 1
+        return kept[::-1]
+
+
+def chunk_text_data(
+    text_list: Iterable[str],
+    max_tokens: int = CHUNK_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS
+) -> Iterator[str]:
+    """Stream token-budgeted chunks out of text segments."""
+    return TextChunker(max_tokens, overlap_tokens).chunks(text_list)
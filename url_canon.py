@@ -0,0 +1,106 @@
+import re
+import hashlib
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Query parameters that only identify a campaign or click, never different content
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "mc_cid", "mc_eid", "_ga", "_gl",
+    "igshid", "ref", "ref_src", "hsa_acc", "hsa_cam", "hsa_grp", "hsa_ad", "hsa_src",
+}
+TRACKING_PREFIXES = ("utm_", "hsa_", "pk_")
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+WORD_PATTERN = re.compile(r"\w+")
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 8  # With a max distance below 8, two near-duplicates always share at least one band
+SHINGLE_SIZE = 3
+MIN_SHINGLES = 20  # Pages with less text than this are too small to fingerprint reliably
+
+
+def canonical_host(url: str) -> str:
+    """Return the url's lowercase host without a leading www."""
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalize a url so trivially different spellings of the same page compare equal:
+    http/https, www, default ports, trailing slashes, tracking params, param order and fragments.
+    """
+    parts = urlsplit(url.strip())
+    host = canonical_host(url)
+    if parts.port and parts.port != DEFAULT_PORTS.get(parts.scheme.lower()):
+        host = f"{host}:{parts.port}"
+
+    path = re.sub(r"/{2,}", "/", parts.path) or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ]
+    return urlunsplit(("https", host, path, urlencode(sorted(query)), ""))
+
+
+def simhash(text: str) -> int:
+    """Compute a 64-bit SimHash over word shingles, or None if the text is too short."""
+    words = WORD_PATTERN.findall(text.lower())
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    if len(shingles) < MIN_SHINGLES:
+        return None
+
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+
+    return sum(1 << bit for bit in range(SIMHASH_BITS) if weights[bit] > 0)
+
+
+class SimHashIndex:
+    '''
+    Finds pages whose text is identical or nearly identical to one already seen
+
+    max_distance: int # fingerprints within this many differing bits count as duplicates
+    Fingerprints are split into bands so a lookup only compares against pages sharing a band.
+    '''
+    def __init__(
+        self,
+        max_distance: int = 3
+    ):
+        self.max_distance = max_distance
+        self.band_bits = SIMHASH_BITS // SIMHASH_BANDS
+        self.bands = [{} for _ in range(SIMHASH_BANDS)]  # band value -> [(fingerprint, url)]
+        self.lock = threading.Lock()
+
+    def band_keys(
+        self,
+        fingerprint: int
+    ) -> list:
+        mask = (1 << self.band_bits) - 1
+        return [fingerprint >> (i * self.band_bits) & mask for i in range(SIMHASH_BANDS)]
+
+    def add(
+        self,
+        url: str,
+        text: str
+    ) -> str:
+        """Index a page's text, returning the url it duplicates instead if there is one."""
+        fingerprint = simhash(text)
+        if fingerprint is None:
+            return None
+
+        with self.lock:
+            keys = self.band_keys(fingerprint)
+            for band, key in zip(self.bands, keys):
+                for other_fingerprint, other_url in band.get(key, ()):
+                    if bin(fingerprint ^ other_fingerprint).count("1") <= self.max_distance:
+                        return other_url
+
+            for band, key in zip(self.bands, keys):
+                band.setdefault(key, []).append((fingerprint, url))
+            return None
@@ -1,12 +1,23 @@
+import os
 import json
 import boto3
 import time
 from generate_menu_handler import GenerateMenuHandler
+from driver_pool import DriverPool
+from resource_filter import ResourceFilter
+from llm_gateway import get_llm_gateway
 
 sqs = boto3.client('sqs', region_name="us-east-2")
 QUEUE_URL = "https://sqs.us-east-2.amazonaws.com/872515259264/menu-tool-queue"
 s3 = boto3.client('s3', region_name="us-east-2")
 
+# Warm Chrome drivers live for the whole worker process and are lent to each job's crawler
+DRIVER_POOL = DriverPool(
+    size=int(os.getenv("DRIVER_POOL_SIZE", "4")),
+    resource_filter=ResourceFilter(),
+    recycle_after=int(os.getenv("DRIVER_RECYCLE_AFTER", "50")),
+)
+
 
 def process_message(message):
     try:
@@ -17,7 +28,7 @@ def process_message(message):
         print(f"Processing request {request_id} for URL: {url}")
 
         # Run menu generation (which internally interacts with S3)
-        gen_handler = GenerateMenuHandler(url, request_id)
+        gen_handler = GenerateMenuHandler(url, request_id, driver_pool=DRIVER_POOL)
         gen_handler.run()
 
         print(f"Successfully processed request {request_id}")
@@ -25,6 +36,15 @@ def process_message(message):
     except Exception as e:
         print(f"Error processing request {request_id}: {str(e)}")
 
+    finally:
+        # Don't let cookies or storage from this job leak into the next one
+        DRIVER_POOL.reset()
+        print(f"Driver pool metrics: {DRIVER_POOL.get_metrics()}")
+        # Reset so the next job reports only its own blocked requests and bytes
+        print(f"Resource filter stats for this job: {DRIVER_POOL.resource_filter.get_stats(reset=True)}")
+        # Reset so the next job reports only its own calls
+        print(f"LLM gateway metrics for this job: {get_llm_gateway().get_metrics(reset=True)}")
+
 
 # Check for messages in the queue
 def poll_sqs():
@@ -51,4 +71,7 @@ def poll_sqs():
         time.sleep(2)
 
 if __name__ == "__main__":
-    poll_sqs()
+    try:
+        poll_sqs()
+    finally:
+        DRIVER_POOL.close()